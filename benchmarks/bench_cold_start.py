@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per measurement: time from interpreter start to
+# the first prediction, split into import, model load and the first call.
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import src.api
+imported = time.perf_counter()
+from src.predict import load_serving_system, predict_message
+system = load_serving_system()
+loaded = time.perf_counter()
+predict_message(system.model, system.vectorizer, "Dear friend, kindly send your bank details")
+first = time.perf_counter()
+
+with open('/proc/self/statm') as f:
+    rss_mb = int(f.read().split()[1]) * resource.getpagesize() / 1e6
+heavy = [m for m in ("pandas", "sklearn", "scipy", "joblib", "matplotlib") if m in sys.modules]
+print(json.dumps({
+    "import_s": imported - start,
+    "load_s": loaded - imported,
+    "first_prediction_s": first - loaded,
+    "total_s": first - start,
+    "rss_mb": rss_mb,
+    "modules": len(sys.modules),
+    "heavy_modules": heavy,
+}))
+"""
+
+
+def probe(env):
+    out = subprocess.run([sys.executable, "-c", PROBE], check=True, capture_output=True,
+                         text=True, cwd=ROOT_DIR, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(env, top):
+    """Cumulative -X importtime of the packages pulled in by `import src.api`, largest first."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.api"],
+                         check=True, capture_output=True, text=True, cwd=ROOT_DIR, env=env)
+    rows = []
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| *(\S+)", line)
+        if match and match.group(3) != "src.api" and ("." not in match.group(3) or match.group(3).startswith("src.")):
+            rows.append((int(match.group(2)), match.group(3)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-prediction of the API.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="top-level imports to list")
+    args = parser.parse_args()
+
+    backends = {"compiled": {}, "sklearn": {"AFF_SERVING_BACKEND": "sklearn"}}
+    print(f"{'backend':10} {'import s':>9} {'load s':>8} {'first s':>8} {'total s':>8} {'RSS MB':>7} {'modules':>8}  heavy")
+    for name, extra in backends.items():
+        env = {**os.environ, **extra}
+        runs = [probe(env) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["total_s"])
+        print(f"{name:10} {best['import_s']:9.3f} {best['load_s']:8.3f} {best['first_prediction_s']:8.4f} "
+              f"{best['total_s']:8.3f} {best['rss_mb']:7.1f} {best['modules']:8d}  "
+              f"{','.join(best['heavy_modules']) or '-'}")
+
+    print(f"\nSlowest imports under src.api (-X importtime, cumulative):")
+    for micros, module in import_profile(dict(os.environ), args.top):
+        print(f"   {module:40s} {micros / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.append(SRC_DIR)
+import data_loader
+
+# Runs in a fresh interpreter per measurement so peak RSS reflects one load only.
+PROBE = """
+import json, resource, sys, time
+sys.path.append({src!r})
+import data_loader
+import pyarrow.parquet
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+
+columns = {columns!r}
+before = rss_mb()
+start = time.perf_counter()
+df = data_loader.read_processed(columns, path={path!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_mb(), "delta_mb": rss_mb() - before, "rows": len(df)}}))
+"""
+
+COLUMN_SETS = {
+    "all columns": None,
+    "label + clean_text": ['label', 'clean_text'],
+    "label only": ['label'],
+}
+
+
+def probe(path, columns):
+    code = PROBE.format(src=SRC_DIR, columns=columns, path=path)
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load time and peak RSS of CSV vs Parquet processed data.")
+    parser.add_argument('--source', default=None, help="processed dataset to convert (default: newest)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = data_loader.read_processed(path=args.source or data_loader.processed_path())
+    print(f"Dataset: {len(df):,} rows")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "csv": os.path.join(tmp, "clean_dataset.csv"),
+            "parquet": os.path.join(tmp, "clean_dataset.parquet"),
+        }
+        df.to_csv(paths["csv"], index=False)
+        df.to_parquet(paths["parquet"], index=False)
+        del df
+
+        print(f"\n{'format':8} {'columns':20} {'size MB':>8} {'load s':>8} {'RSS MB':>8} {'+load MB':>9}")
+        for fmt, path in paths.items():
+            size_mb = os.path.getsize(path) / 1e6
+            for name, columns in COLUMN_SETS.items():
+                runs = [probe(path, columns) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r["seconds"])
+                print(f"{fmt:8} {name:20} {size_mb:8.1f} {best['seconds']:8.3f} "
+                      f"{best['rss_mb']:8.1f} {best['delta_mb']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Train and serve every featurizer preset (src/featurizers.py) on the same data
+and report the speed/memory/accuracy trade-off: vectorize and fit time, matrix
+nnz and size, peak RSS of the training process, artifact size, CV/holdout F1
+and single-message serving latency. Each configuration runs train_robust()
+and load_serving_system() in its own interpreter inside a temporary copy of
+src/, so models/ is never touched and peak RSS is per configuration.
+
+    python benchmarks/bench_featurizers.py                       # all presets on data/processed/
+    python benchmarks/bench_featurizers.py --dtype float32 --featurizers unigram bigram
+    python benchmarks/bench_featurizers.py --messages 20000      # synthetic corpus instead
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESSED_DIR = os.path.join(ROOT_DIR, "data", "processed")
+DATASET_NAMES = ("clean_dataset.csv", "clean_dataset.parquet")
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from featurizers import DTYPES, FEATURIZERS  # noqa: E402
+
+
+def run_config(args):
+    """Child process: train one configuration, load it the way the API does and time single predictions."""
+    import pandas as pd
+    import train_model
+    from featurizers import featurizer_config
+    from predict import load_serving_system, predict_message
+
+    config = featurizer_config(args.run, dtype=args.dtype)
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = train_model.train_robust(use_cache=False, n_jobs=1, featurizer=config)
+        system = load_serving_system()
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    texts = pd.read_csv(train_model.TEST_PREDS_PATH, usecols=['text'])['text'].astype(str).tolist()
+    texts = texts[:args.latency_calls]
+    predict_message(system.model, system.vectorizer, texts[0], None, system.threshold, system.explainer)
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        predict_message(system.model, system.vectorizer, text, None, system.threshold, system.explainer)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1e6
+    report.update(
+        peak_rss_mb=peak_rss_mb,
+        backend=type(system.model).__name__,
+        latency_us={"p50": float(np.percentile(latencies, 50)), "p99": float(np.percentile(latencies, 99))},
+    )
+    return report
+
+
+def make_workspace(path, messages, seed):
+    """A copy of src/ next to either a link to the real processed dataset or a freshly ingested synthetic one."""
+    shutil.copytree(os.path.join(ROOT_DIR, "src"), os.path.join(path, "src"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    processed = os.path.join(path, "data", "processed")
+    os.makedirs(processed)
+    os.makedirs(os.path.join(path, "models"))
+    if messages:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from synthetic import write_raw_corpus
+
+        write_raw_corpus(os.path.join(path, "data", "raw"), messages, seed)
+        subprocess.run([sys.executable, os.path.join(path, "src", "data_loader.py")], check=True,
+                       capture_output=True)
+        return f"synthetic ({messages} messages)"
+    datasets = [name for name in DATASET_NAMES if os.path.exists(os.path.join(PROCESSED_DIR, name))]
+    if not datasets:
+        sys.exit("No processed dataset found; run src/data_loader.py first or pass --messages N.")
+    for name in datasets:
+        os.symlink(os.path.join(PROCESSED_DIR, name), os.path.join(processed, name))
+    return PROCESSED_DIR
+
+
+def print_report(results):
+    print(f"{'featurizer':14} {'dtype':8} {'feats':>7} {'nnz':>10} {'X MB':>7} {'RSS MB':>7} {'vec s':>6} "
+          f"{'fit s':>6} {'pkl MB':>7} {'cmp MB':>7} {'backend':10} {'p50 us':>7} {'p99 us':>7} "
+          f"{'CV F1':>6} {'test F1':>7}")
+    for r in results:
+        f, t, a = r["features"], r["timings"], r["artifacts_mb"]
+        print(f"{r['featurizer']['name']:14} {f['dtype']:8} {f['n_features']:>7} {f['nnz']:>10} "
+              f"{f['matrix_mb']:>7.1f} {r['peak_rss_mb']:>7.0f} {t['vectorize']:>6.2f} {t['fit (wall)']:>6.2f} "
+              f"{a['pickles']:>7.2f} {a['compiled']:>7.2f} {r['backend']:10} {r['latency_us']['p50']:>7.0f} "
+              f"{r['latency_us']['p99']:>7.0f} {r['cv']['f1']:>6.2%} {r['holdout']['f1']:>7.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare featurizer configurations end to end.")
+    parser.add_argument('--featurizers', nargs='+', choices=list(FEATURIZERS), default=list(FEATURIZERS))
+    parser.add_argument('--dtype', choices=list(DTYPES), help="feature dtype for every configuration")
+    parser.add_argument('--messages', type=int, default=0,
+                        help="train on a synthetic corpus of this size instead of data/processed/")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-calls', type=int, default=2000, help="predict_message calls for p50/p99")
+    parser.add_argument('--out', help="also write the results as JSON to this file")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON instead of a table")
+    parser.add_argument('--run', choices=list(FEATURIZERS), help=argparse.SUPPRESS)
+    parser.add_argument('--workspace', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        sys.path.insert(0, os.path.join(args.workspace, "src"))
+        print(json.dumps(run_config(args)))
+        return
+
+    workspace = tempfile.mkdtemp(prefix="aff-featurizers-")
+    results = []
+    try:
+        source = make_workspace(workspace, args.messages, args.seed)
+        env = {k: v for k, v in os.environ.items() if not k.startswith("AFF_")}
+        for name in args.featurizers:
+            print(f"Training {name} on {source}...", file=sys.stderr)
+            command = [sys.executable, os.path.abspath(__file__), "--run", name, "--workspace", workspace,
+                       "--latency-calls", str(args.latency_calls)]
+            if args.dtype:
+                command += ["--dtype", args.dtype]
+            out = subprocess.run(command, check=True, capture_output=True, text=True, env=env)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+import data_loader
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wall-clock speedup of data_loader --workers N.")
+    parser.add_argument('--raw-dir', default=data_loader.RAW_DATA_PATH)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--stream', action='store_true', help="benchmark the streaming path")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            output_path = os.path.join(tmp, f"clean_dataset_{workers}.csv")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if args.stream:
+                    data_loader.stream_and_process_data(workers=workers, raw_dir=args.raw_dir,
+                                                        output_path=output_path)
+                else:
+                    data_loader.load_and_process_data(workers=workers, raw_dir=args.raw_dir,
+                                                      output_path=output_path)
+            elapsed = time.perf_counter() - start
+            results.append((workers, elapsed, file_digest(output_path)))
+
+    base = results[0][1]
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}  output")
+    for workers, elapsed, digest in results:
+        same = "identical" if digest == results[0][2] else "DIFFERS"
+        print(f"{workers:>8} {elapsed:>9.2f} {base / elapsed:>7.2f}x  {same}")
+    if len({digest for _, _, digest in results}) != 1:
+        sys.exit("Parallel output differs from the first run.")
+
+
+if __name__ == "__main__":
+    main()
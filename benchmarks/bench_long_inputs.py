@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from synthetic import adversarial_texts
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from predict import load_serving_system, predict_message  # noqa: E402
+from text_cleaning import bound_text  # noqa: E402
+
+
+def _best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Worst-case /predict scoring latency on adversarial long inputs, full vs bounded-cost."
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[65_536, 1_000_000, 4_000_000],
+                        help="input sizes in characters")
+    parser.add_argument('--max-chars', type=int, default=65_536, help="AFF_SCORE_MAX_CHARS to compare")
+    parser.add_argument('--max-tokens', type=int, default=4096, help="AFF_SCORE_MAX_TOKENS to compare")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help="print raw results as JSON")
+    args = parser.parse_args()
+
+    system = load_serving_system()
+    if system is None:
+        sys.exit("No model found; run src/train_model.py first.")
+    model, vectorizer, explainer = system.model, system.vectorizer, system.explainer
+
+    modes = {
+        "full": {},
+        "chars": {"max_chars": args.max_chars},
+        "tokens": {"max_tokens": args.max_tokens},
+    }
+    results = []
+    for size in args.sizes:
+        for kind, text in adversarial_texts(size).items():
+            row = {"kind": kind, "chars": len(text)}
+            for mode, limits in modes.items():
+                def score():
+                    bounded, _ = bound_text(text, **limits)
+                    predict_message(model, vectorizer, bounded, None, system.threshold, explainer)
+                row[f"{mode}_ms"] = _best_ms(score, args.repeat)
+                row[f"{mode}_scored"] = bound_text(text, **limits)[1] / len(text)
+            results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'input':16} {'chars':>9} {'full ms':>9} {'chars ms':>9} {'scored':>7} {'tokens ms':>10} {'scored':>7}")
+    for r in results:
+        print(f"{r['kind']:16} {r['chars']:>9} {r['full_ms']:>9.2f} {r['chars_ms']:>9.2f} {r['chars_scored']:>7.1%} "
+              f"{r['tokens_ms']:>10.2f} {r['tokens_scored']:>7.1%}")
+    print(f"{'worst case':16} {'':>9} {max(r['full_ms'] for r in results):>9.2f} "
+          f"{max(r['chars_ms'] for r in results):>9.2f} {'':>7} {max(r['tokens_ms'] for r in results):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import json
+
+from loadgen import free_port, run_load, start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p99/throughput of /predict with and without micro-batching.")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--window-ms', default="2")
+    parser.add_argument('--max-items', default="64")
+    parser.add_argument('--json', action='store_true', help="print raw results as JSON")
+    args = parser.parse_args()
+
+    modes = {
+        "per-request": {"AFF_MICROBATCH": "0"},
+        "micro-batched": {"AFF_MICROBATCH": "1", "AFF_MICROBATCH_WINDOW_MS": args.window_ms,
+                          "AFF_MICROBATCH_MAX_ITEMS": args.max_items},
+    }
+    results = []
+    for mode, env in modes.items():
+        port = free_port()
+        server = start_server(port, env)
+        try:
+            for concurrency in args.concurrency:
+                stats = run_load(port, concurrency=concurrency, duration=args.duration)
+                results.append({"mode": mode, "concurrency": concurrency, **stats})
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':14} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for r in results:
+        print(f"{r['mode']:14} {r['concurrency']:>5} {r['throughput_rps']:>9.0f} "
+              f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import json
+import time
+
+from loadgen import SAMPLE_TEXTS, free_port, run_load, start_server
+
+
+async def _read_chunked(reader):
+    """Yield the body chunks of a chunked HTTP/1.1 response."""
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if size == 0:
+            await reader.readline()
+            return
+        data = await reader.readexactly(size)
+        await reader.readexactly(2)
+        yield data
+
+
+async def _one_stream(port, n_messages, send_batch):
+    """
+    POST n_messages NDJSON lines as a chunked request, sending `send_batch`
+    lines per chunk while results are read back concurrently.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"POST /predict/stream HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                 b"Content-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+    lines = [(json.dumps({"text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]}) + "\n").encode()
+             for i in range(n_messages)]
+
+    async def send():
+        for start in range(0, n_messages, send_batch):
+            block = b"".join(lines[start:start + send_batch])
+            writer.write(b"%x\r\n%s\r\n" % (len(block), block))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def receive():
+        status = int((await reader.readline()).split()[1])
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        received = errors = 0
+        async for data in _read_chunked(reader):
+            received += data.count(b"\n")
+            errors += data.count(b'"error"')
+        return status, received, errors
+
+    _, (status, received, errors) = await asyncio.gather(send(), receive())
+    writer.close()
+    return status, received, errors
+
+
+def run_streams(port, streams, n_messages, send_batch):
+    async def main():
+        return await asyncio.gather(*[_one_stream(port, n_messages, send_batch) for _ in range(streams)])
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    received = sum(r[1] for r in results)
+    return {
+        "messages": received,
+        "errors": sum(r[2] for r in results) + sum(r[0] != 200 for r in results),
+        "throughput_msgs": received / elapsed,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Messages/s of /predict/stream vs per-request /predict.")
+    parser.add_argument('--messages', type=int, default=50_000, help="messages per stream")
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--send-batch', type=int, default=100, help="lines per request chunk sent by the client")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 64],
+                        help="connections for the /predict comparison")
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port, {"AFF_CACHE_SIZE": "0"})
+    try:
+        rows = []
+        for concurrency in args.concurrency:
+            stats = run_load(port, concurrency=concurrency, duration=args.duration)
+            rows.append((f"/predict, {concurrency} conns", stats["throughput_rps"], stats["errors"]))
+        for streams in args.streams:
+            stats = run_streams(port, streams, args.messages, args.send_batch)
+            rows.append((f"/predict/stream, {streams} streams", stats["throughput_msgs"], stats["errors"]))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{'path':32} {'msgs/s':>9} {'errors':>7}")
+    for name, throughput, errors in rows:
+        print(f"{name:32} {throughput:>9.0f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
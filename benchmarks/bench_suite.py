@@ -0,0 +1,356 @@
+"""
+End-to-end benchmark suite for the hot paths: clean_text, ingestion,
+training, predict_message(s) and in-process /predict. Runs offline on a
+synthetic corpus (see synthetic.py) inside a throwaway copy of src/, so the
+real data/ and models/ are never touched. Results are written as JSON and can
+be compared against a stored baseline to flag regressions:
+
+    python benchmarks/bench_suite.py --out benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("ingest", "train", "predict", "api")
+DEFAULT_TOLERANCE = 0.25
+
+
+def metric(value, unit, better):
+    return {"value": float(value), "unit": unit, "better": better}
+
+
+def _median_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+# --- Phases. Each runs in its own interpreter inside the workspace and returns {name: metric}.
+
+def phase_ingest(workspace, args):
+    from synthetic import make_corpus
+    from text_cleaning import clean_text
+    import data_loader
+
+    texts, _ = make_corpus(args.messages, seed=args.seed)
+    mb = sum(len(t) for t in texts) / 1e6
+    seconds = _median_seconds(lambda: [clean_text(t) for t in texts], args.repeat)
+    output_path = os.path.join(workspace, "data", "processed", "clean_dataset.csv")
+
+    def ingest():
+        with _quiet():
+            data_loader.load_and_process_data(raw_dir=os.path.join(workspace, "data", "raw"),
+                                              output_path=output_path)
+    return {
+        "clean_text.throughput": metric(len(texts) / seconds, "msg/s", "higher"),
+        "clean_text.mb_per_s": metric(mb / seconds, "MB/s", "higher"),
+        "load_and_process_data.seconds": metric(_median_seconds(ingest, args.repeat), "s", "lower"),
+    }
+
+
+def phase_train(workspace, args):
+    import train_model
+
+    runs = []
+    for _ in range(args.repeat):
+        with _quiet():
+            runs.append(train_model.train_robust(use_cache=False, n_jobs=1)["timings"])
+    return {
+        f"train_robust.{stage.split(' ')[0]}_seconds": metric(np.median([r[stage] for r in runs]), "s", "lower")
+        for stage in ("vectorize", "fit (wall)", "save", "total")
+    }
+
+
+def _latencies(fn, items):
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e6
+
+
+# Size of the adversarial inputs and the bounded-cost limit they are also scored under.
+ADVERSARIAL_CHARS = 1_000_000
+ADVERSARIAL_MAX_CHARS = 65_536
+# predict_messages is also timed on one large batch, the size /predict/stream
+# and bulk scoring send, where per-token costs dominate per-call ones.
+LARGE_BATCH_SIZE = 5000
+
+
+def phase_predict(workspace, args):
+    from synthetic import adversarial_texts, make_corpus
+    from predict import load_serving_system, predict_message, predict_messages
+    from text_cleaning import bound_text
+
+    texts, _ = make_corpus(max(args.single_calls, args.batch_size, LARGE_BATCH_SIZE), seed=args.seed + 1)
+    results = {}
+    for backend in ("compiled", "sklearn"):
+        os.environ["AFF_SERVING_BACKEND"] = backend
+        with _quiet():
+            system = load_serving_system()
+        model, vectorizer, explainer = system.model, system.vectorizer, system.explainer
+        predict_message(model, vectorizer, texts[0], None, None, explainer)
+        single = _latencies(lambda t: predict_message(model, vectorizer, t, None, None, explainer),
+                            texts[:args.single_calls])
+        batch = texts[:args.batch_size]
+        seconds = _median_seconds(lambda: predict_messages(model, vectorizer, batch, None, None, explainer),
+                                  args.repeat)
+        large = texts[:LARGE_BATCH_SIZE]
+        large_seconds = _median_seconds(
+            lambda: predict_messages(model, vectorizer, large, None, None, explainer), args.repeat)
+        results.update({
+            f"predict_message[{backend}].p50_us": metric(np.percentile(single, 50), "us", "lower"),
+            f"predict_message[{backend}].p99_us": metric(np.percentile(single, 99), "us", "lower"),
+            f"predict_messages[{backend}].batch_ms": metric(seconds * 1e3, "ms", "lower"),
+            f"predict_messages[{backend}].throughput": metric(len(batch) / seconds, "msg/s", "higher"),
+            f"predict_messages[{backend},{LARGE_BATCH_SIZE}].batch_ms": metric(large_seconds * 1e3, "ms", "lower"),
+            f"predict_messages[{backend},{LARGE_BATCH_SIZE}].throughput": metric(
+                LARGE_BATCH_SIZE / large_seconds, "msg/s", "higher"),
+        })
+        if backend == "compiled":
+            # Worst case over inputs built to be slow, scored whole and head+tail only.
+            adversarial = list(adversarial_texts(ADVERSARIAL_CHARS, seed=args.seed).values())
+            full = max(_median_seconds(lambda: predict_message(model, vectorizer, t, None, None, explainer), 1)
+                       for t in adversarial)
+            bounded = max(_median_seconds(lambda: predict_message(
+                model, vectorizer, bound_text(t, ADVERSARIAL_MAX_CHARS)[0], None, None, explainer), 1)
+                for t in adversarial)
+            results.update({
+                "predict_message[adversarial].worst_ms": metric(full * 1e3, "ms", "lower"),
+                "predict_message[adversarial,bounded].worst_ms": metric(bounded * 1e3, "ms", "lower"),
+            })
+    return results
+
+
+async def _asgi_post(app, path, payload):
+    """POST `payload` as JSON straight into the ASGI app; returns the status code."""
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Future()  # the client never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def phase_api(workspace, args):
+    from synthetic import make_corpus
+    from loadgen import summarize
+
+    # Distinct texts and no cache, so every request is actually scored.
+    os.environ["AFF_CACHE_SIZE"] = "0"
+    with _quiet():
+        from src.api import app
+    texts, _ = make_corpus(5000, seed=args.seed + 2)
+
+    async def run():
+        latencies, errors = [], []
+        async with app.router.lifespan_context(app):
+            async def worker(offset):
+                i = offset
+                while time.perf_counter() < stop_at:
+                    start = time.perf_counter()
+                    status = await _asgi_post(app, "/predict", {"text": texts[i % len(texts)]})
+                    latencies.append(time.perf_counter() - start)
+                    if status != 200:
+                        errors.append(status)
+                    i += args.concurrency
+            await _asgi_post(app, "/predict", {"text": texts[0]})
+            started = time.perf_counter()
+            stop_at = started + args.api_duration
+            await asyncio.gather(*[worker(i) for i in range(args.concurrency)])
+            return summarize(latencies, errors, time.perf_counter() - started)
+
+    with _quiet():
+        stats = asyncio.run(run())
+    return {
+        "api.predict.throughput": metric(stats["throughput_rps"], "req/s", "higher"),
+        "api.predict.p50_ms": metric(stats["p50_ms"], "ms", "lower"),
+        "api.predict.p99_ms": metric(stats["p99_ms"], "ms", "lower"),
+        "api.predict.errors": metric(stats["errors"], "count", "lower"),
+    }
+
+
+# --- Orchestration
+
+def make_workspace(path, messages, seed):
+    """A copy of src/ with a synthetic data/raw/, so every path the code derives from its own location is private."""
+    from synthetic import write_raw_corpus
+
+    shutil.copytree(os.path.join(ROOT_DIR, "src"), os.path.join(path, "src"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    for sub in ("models", os.path.join("data", "processed")):
+        os.makedirs(os.path.join(path, sub), exist_ok=True)
+    return write_raw_corpus(os.path.join(path, "data", "raw"), messages, seed)
+
+
+def run_phase(phase, workspace, args):
+    command = [sys.executable, os.path.abspath(__file__), "--phase", phase, "--workspace", workspace,
+               "--messages", str(args.messages), "--seed", str(args.seed), "--repeat", str(args.repeat),
+               "--single-calls", str(args.single_calls), "--batch-size", str(args.batch_size),
+               "--concurrency", str(args.concurrency), "--api-duration", str(args.api_duration)]
+    env = {k: v for k, v in os.environ.items() if not k.startswith("AFF_")}
+    out = subprocess.run(command, check=True, capture_output=True, text=True, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Rows of (name, baseline, current, relative change, status) for every
+    metric in both runs. A metric regresses when it moved in its "worse"
+    direction by more than `tolerance` (a fraction of the baseline value).
+    """
+    rows = []
+    for name, current in results["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None:
+            rows.append((name, None, current["value"], None, "new"))
+            continue
+        change = (current["value"] - base["value"]) / base["value"] if base["value"] else 0.0
+        worse = change if current["better"] == "lower" else -change
+        if current["unit"] == "count":
+            worse = current["value"] - base["value"]
+        status = "REGRESSION" if worse > tolerance else ("improved" if worse < -tolerance else "ok")
+        rows.append((name, base["value"], current["value"], change, status))
+    return rows
+
+
+def print_results(results, rows=None):
+    print(f"{'metric':46} {'value':>12} {'unit':6}" + (f" {'baseline':>12} {'change':>8}  status" if rows else ""))
+    by_name = {row[0]: row for row in rows or []}
+    for name, m in results["metrics"].items():
+        line = f"{name:46} {m['value']:>12.2f} {m['unit']:6}"
+        if name in by_name:
+            _, base, _, change, status = by_name[name]
+            line += f" {base:>12.2f} {change:>+8.1%}  {status}" if base is not None else f" {'-':>12} {'-':>8}  {status}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, training and serving on a synthetic corpus.")
+    parser.add_argument('--messages', type=int, default=20_000, help="size of the synthetic corpus")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per timing; the median is reported")
+    parser.add_argument('--single-calls', type=int, default=2000, help="predict_message calls for p50/p99")
+    parser.add_argument('--batch-size', type=int, default=1000, help="texts per predict_messages batch")
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent in-process /predict clients")
+    parser.add_argument('--api-duration', type=float, default=5.0, help="seconds of /predict load")
+    parser.add_argument('--out', help="write the results as JSON to this file (e.g. a new baseline)")
+    parser.add_argument('--baseline', help="JSON from an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="relative change in the worse direction that counts as a regression")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON instead of a table")
+    parser.add_argument('--keep', action='store_true', help="keep the temporary workspace")
+    parser.add_argument('--phase', choices=PHASES, help=argparse.SUPPRESS)
+    parser.add_argument('--workspace', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        sys.path[:0] = [os.path.join(args.workspace, "src"), args.workspace]
+        print(json.dumps(globals()[f"phase_{args.phase}"](args.workspace, args)))
+        return
+
+    workspace = tempfile.mkdtemp(prefix="aff-bench-")
+    try:
+        written = make_workspace(workspace, args.messages, args.seed)
+        metrics = {}
+        for phase in PHASES:
+            print(f"Running {phase}...", file=sys.stderr)
+            metrics.update(run_phase(phase, workspace, args))
+    finally:
+        if args.keep:
+            print(f"Workspace kept at {workspace}", file=sys.stderr)
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    import sklearn
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "messages": written,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "metrics": metrics,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    rows = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("messages") != written:
+            print(f"Note: baseline used {baseline['meta'].get('messages')} messages, this run {written}.",
+                  file=sys.stderr)
+        rows = compare(results, baseline, args.tolerance)
+        results["comparison"] = {
+            "baseline": args.baseline,
+            "tolerance": args.tolerance,
+            "regressions": [row[0] for row in rows if row[4] == "REGRESSION"],
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results, rows)
+    if rows and results["comparison"]["regressions"]:
+        print(f"\n{len(results['comparison']['regressions'])} regression(s) beyond {args.tolerance:.0%}: "
+              + ", ".join(results["comparison"]["regressions"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from loadgen import free_port, run_load, start_server
+
+
+def _children(pid):
+    kids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        if int(fields[1]) == pid and b"resource_tracker" not in cmdline:
+            kids.append(int(entry))
+    return kids
+
+
+def _memory_mb(pid):
+    """Rss and Pss of one process; Pss splits shared pages between their users."""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                out[name.lower()] = int(value.split()[0]) / 1024
+    return out
+
+
+def measure(mode, workers, backend, concurrency, duration):
+    port = free_port()
+    env = {"AFF_SERVING_BACKEND": backend, "AFF_CACHE_SIZE": "0"}
+    if mode == "preload":
+        command = [sys.executable, "main.py", "serve", "--port", str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+        server = start_server(port, env, command=command)
+    else:
+        server = start_server(port, env, args=("--workers", str(workers)))
+    try:
+        # Let every worker finish starting before sampling memory.
+        deadline = time.time() + 60
+        pids = _children(server.pid) if workers > 1 else [server.pid]
+        while len(pids) < workers and time.time() < deadline:
+            time.sleep(0.2)
+            pids = _children(server.pid)
+        time.sleep(1.0)
+        stats = run_load(port, concurrency=concurrency, duration=duration)
+        memory = [_memory_mb(pid) for pid in pids]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "mode": mode,
+        "backend": backend,
+        "workers": workers,
+        "rss_mb_per_worker": sum(m["rss"] for m in memory) / len(memory),
+        "pss_mb_per_worker": sum(m["pss"] for m in memory) / len(memory),
+        "pss_mb_total": sum(m["pss"] for m in memory),
+        **stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory and throughput of multi-process serving.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--backends', nargs='+', default=["compiled", "sklearn"])
+    parser.add_argument('--modes', nargs='+', default=["preload", "uvicorn"],
+                        help="preload = main.py serve (fork after loading); uvicorn = uvicorn --workers")
+    parser.add_argument('--concurrency-per-worker', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--json', action='store_true', help="print raw results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        for mode in args.modes:
+            for workers in args.workers:
+                results.append(measure(mode, workers, backend,
+                                       args.concurrency_per_worker * workers, args.duration))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'backend':9} {'mode':8} {'workers':>7} {'RSS/wkr':>8} {'PSS/wkr':>8} {'PSS sum':>8} "
+          f"{'req/s':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    for r in results:
+        print(f"{r['backend']:9} {r['mode']:8} {r['workers']:>7} {r['rss_mb_per_worker']:8.1f} "
+              f"{r['pss_mb_per_worker']:8.1f} {r['pss_mb_total']:8.1f} {r['throughput_rps']:8.0f} "
+              f"{r['p50_ms']:7.2f} {r['p99_ms']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
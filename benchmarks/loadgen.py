@@ -0,0 +1,128 @@
+"""
+Tiny keep-alive HTTP/1.1 load generator and uvicorn launcher used by the
+serving benchmarks. Standard library only, so benchmarks need nothing beyond
+the project's own dependencies.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_TEXTS = [
+    "Dear Friend, I am a banker. I need your help to transfer $15 million USD. This is urgent.",
+    "Congratulations! You have won a cash prize of 1,000,000 GBP. Call now to claim your award.",
+    "Hi team, the quarterly report is attached. Let's review it at Thursday's meeting.",
+    "Work from home! Earn $5000 weekly. Send a $99 registration fee to start immediately.",
+    "Reminder: your dentist appointment is tomorrow at 10am. Reply C to confirm.",
+    "Can you send me the slides from yesterday's presentation? Thanks!",
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, env=None, args=(), command=None):
+    """
+    Start uvicorn serving src.api:app in a subprocess (or `command`, which must
+    listen on `port`) and wait until /health answers.
+    """
+    full_env = dict(os.environ, **(env or {}))
+    if command is None:
+        command = [sys.executable, "-m", "uvicorn", "src.api:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--log-level", "warning", *args]
+    proc = subprocess.Popen(command, cwd=ROOT_DIR, env=full_env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            status, _ = asyncio.run(_one_request(port, "GET", "/health"))
+            if status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not become healthy")
+
+
+async def _one_request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        return await request(reader, writer, method, path, body)
+    finally:
+        writer.close()
+
+
+async def request(reader, writer, method, path, body=None, content_type="application/json"):
+    payload = b"" if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode())
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+        f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n"
+    )
+    writer.write(head.encode() + payload)
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    data = await reader.readexactly(length) if length else b""
+    return status, data
+
+
+async def _worker(port, path, make_body, stop_at, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", path, make_body(i))
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+
+def run_load(port, path="/predict", concurrency=32, duration=10.0, make_body=None):
+    """Hammer `path` with `concurrency` keep-alive connections for `duration` seconds."""
+    if make_body is None:
+        def make_body(i):
+            return {"text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]}
+
+    async def main():
+        latencies, errors = [], []
+        stop_at = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            _worker(port, path, make_body, stop_at, latencies, errors) for _ in range(concurrency)
+        ])
+        return latencies, errors, time.perf_counter() - started
+
+    latencies, errors, elapsed = asyncio.run(main())
+    return summarize(latencies, errors, elapsed)
+
+
+def summarize(latencies, errors, elapsed):
+    lat = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+    }
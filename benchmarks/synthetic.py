@@ -0,0 +1,125 @@
+"""
+Synthetic AFF/ham corpora for benchmarks: seeded, offline and sized on
+demand. write_raw_corpus() lays the messages out as the four raw files
+data_loader expects, so the real ingestion code runs on them unchanged.
+"""
+import csv
+import os
+
+import numpy as np
+
+FRAUD_PHRASES = [
+    "i am the son of the late minister of finance",
+    "we need your assistance to transfer the sum of {amount} usd",
+    "this transaction is 100% risk free and confidential",
+    "kindly send your bank account details and private phone number",
+    "you will receive 30% of the total fund for your assistance",
+    "congratulations you have won {amount} gbp in the international lottery",
+    "contact our claims agent immediately to process your prize",
+    "a processing fee of {small} usd is required before release of the funds",
+    "the deceased left a deposit with no next of kin",
+    "work from home and earn {small} dollars weekly with no experience",
+    "send the registration fee by western union to secure the position",
+    "reply urgently as this offer expires in 48 hours",
+    "the barrister will prepare the necessary legal documents",
+    "god bless you as you assist me in this urgent matter",
+]
+
+HAM_PHRASES = [
+    "please find the quarterly report attached for review",
+    "can we move the meeting to thursday afternoon",
+    "the gas nomination for next month has been updated",
+    "thanks for sending the slides from yesterday",
+    "let me know if the contract changes look good to you",
+    "the server maintenance window starts at {hour} pm",
+    "lunch is on the team this friday at noon",
+    "i have forwarded the invoice to accounts payable",
+    "your dentist appointment is tomorrow at {hour} am",
+    "the pipeline volumes were revised after the audit",
+    "see the attached spreadsheet for the updated schedule",
+    "we should discuss the budget before the end of the quarter",
+    "reminder the training session has moved to room {hour}",
+    "i will be out of the office until monday",
+]
+
+SHARED_WORDS = ["please", "account", "money", "call", "today", "information", "business",
+                "office", "time", "help", "contact", "send", "number", "email", "week"]
+
+
+def _message(rng, phrases, n_phrases):
+    parts = []
+    for _ in range(n_phrases):
+        phrase = phrases[rng.integers(len(phrases))]
+        phrase = phrase.format(amount=f"{rng.integers(1, 50)}.{rng.integers(10)} million",
+                               small=int(rng.integers(50, 5000)), hour=int(rng.integers(1, 12)))
+        parts.append(phrase)
+        if rng.random() < 0.4:
+            parts.append(" ".join(rng.choice(SHARED_WORDS, size=rng.integers(1, 4))))
+    return ". ".join(parts).capitalize() + "."
+
+
+def make_corpus(n_messages, fraud_fraction=0.35, seed=0, mean_phrases=8):
+    """(texts, labels) with about `fraud_fraction` fraud; message lengths vary around `mean_phrases` phrases."""
+    rng = np.random.default_rng(seed)
+    labels = (rng.random(n_messages) < fraud_fraction).astype(np.int64)
+    lengths = 1 + rng.poisson(mean_phrases - 1, size=n_messages)
+    texts = [
+        _message(rng, FRAUD_PHRASES if label else HAM_PHRASES, int(length))
+        for label, length in zip(labels, lengths)
+    ]
+    return texts, labels
+
+
+def write_raw_corpus(raw_dir, n_messages, seed=0):
+    """
+    Write a corpus of about n_messages as data/raw files: fraud split between
+    the 419 mbox-style dump, lottery SMS and fake job ads; ham as the email
+    CSV plus some SMS. Returns the number of messages written.
+    """
+    texts, labels = make_corpus(n_messages, seed=seed)
+    os.makedirs(raw_dir, exist_ok=True)
+    fraud = [t for t, label in zip(texts, labels) if label == 1]
+    ham = [t for t, label in zip(texts, labels) if label == 0]
+    n_sms = len(fraud) // 5
+    n_jobs = len(fraud) // 5
+    emails, sms, jobs = fraud[:-(n_sms + n_jobs)], fraud[-(n_sms + n_jobs):-n_jobs], fraud[-n_jobs:]
+
+    with open(os.path.join(raw_dir, "fradulent_emails.txt"), "w", encoding="latin-1", errors="replace") as f:
+        for i, text in enumerate(emails):
+            f.write(f"From r  Mon Jan {i % 28 + 1} 12:00:00 2004\nSubject: URGENT ASSISTANCE\n\n{text}\n\n")
+    with open(os.path.join(raw_dir, "spam_ham_dataset.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["label", "text"])
+        writer.writerows(("ham", f"Subject: re: update\r\n{text}") for text in ham)
+    with open(os.path.join(raw_dir, "sms_spam.csv"), "w", newline="", encoding="latin-1", errors="replace") as f:
+        writer = csv.writer(f)
+        writer.writerow(["v1", "v2"])
+        # Every fraud SMS contains a keyword data_loader keeps ("won", "claim", ...).
+        writer.writerows(("spam", f"URGENT you have won a prize call now to claim. {text}") for text in sms)
+        writer.writerows(("ham", text) for text in ham[:len(sms)])
+    with open(os.path.join(raw_dir, "fake_job_postings.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "description", "fraudulent"])
+        writer.writerows(("Home based data entry clerk", text, 1) for text in jobs)
+        writer.writerows(("Operations analyst", text, 0) for text in ham[:len(jobs)])
+    return len(texts)
+
+
+def adversarial_texts(n_chars, seed=0):
+    """
+    Inputs of about n_chars characters built to make scoring slow rather than
+    to look real, by name: a long AFF letter, many distinct tokens (one
+    vocabulary lookup each), a single unbroken token, header-like lines for
+    clean_text's header regex, and non-ASCII text that cleans to nothing.
+    """
+    rng = np.random.default_rng(seed)
+    letter = _message(rng, FRAUD_PHRASES, 8) + " "
+    alphabet = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    distinct = " ".join("".join(rng.choice(alphabet, size=8)) for _ in range(n_chars // 9 + 1))
+    return {
+        "long_letter": (letter * (n_chars // len(letter) + 1))[:n_chars],
+        "distinct_tokens": distinct[:n_chars],
+        "one_token": "a" * n_chars,
+        "header_lines": ("to: from: subject: date: received: x\n" * (n_chars // 37 + 1))[:n_chars],
+        "non_ascii": ("дорогой друг, переведите деньги " * (n_chars // 32 + 1))[:n_chars],
+    }
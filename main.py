@@ -1,5 +1,62 @@
+import argparse
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def main():
-    print("Hello from baggage!")
+    parser = argparse.ArgumentParser(description="AFF detector entry points.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the HTTP API")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--workers", type=int, default=1,
+                              help="worker processes forked after the model is loaded once")
+    serve_parser.add_argument("--log-level", default="info")
+
+    pipeline_parser = commands.add_parser(
+        "pipeline", help="ingest, verify, train and report, skipping stages whose inputs are unchanged"
+    )
+    pipeline_parser.add_argument("stages", nargs="*",
+                                 help="run only these stages and their upstream (ingest, verify, train, "
+                                      "analyze, metrics; default: all)")
+    pipeline_parser.add_argument("--force", action="store_true", help="rerun every selected stage")
+    pipeline_parser.add_argument("--dry-run", action="store_true", help="show which stages would run")
+    pipeline_parser.add_argument("--jobs", type=_positive_int, default=3,
+                                 help="stages run at once (default: %(default)s)")
+    pipeline_parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                                 help="processed dataset format (default: %(default)s)")
+    pipeline_parser.add_argument("--dedupe", action="store_true", help="drop near-duplicates during ingest")
+    pipeline_parser.add_argument("--workers", type=int, default=1, help="ingest processes")
+    pipeline_parser.add_argument("--featurizer", default="unigram", help="preset from src/featurizers.py")
+    pipeline_parser.add_argument("--max-features", type=int)
+    pipeline_parser.add_argument("--dtype", choices=["int32", "int64", "float32", "float64"])
+    pipeline_parser.add_argument("--n-jobs", type=int, default=1, help="training processes")
+    pipeline_parser.add_argument("--no-plots", action="store_true", help="skip the matplotlib plots")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        from src.serve import serve
+
+        serve(host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+    elif args.command == "pipeline":
+        from src.featurizers import featurizer_config
+        from src.pipeline import run_pipeline
+
+        try:
+            featurizer = featurizer_config(args.featurizer, max_features=args.max_features, dtype=args.dtype)
+            record = run_pipeline(args.stages, force=args.force, dry_run=args.dry_run, jobs=args.jobs,
+                                  data_format=args.format, dedupe=args.dedupe, workers=args.workers,
+                                  featurizer=featurizer, n_jobs=args.n_jobs, plots=not args.no_plots)
+        except ValueError as exc:
+            parser.error(str(exc))
+        if not record["ok"]:
+            raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,13 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
 import joblib
 import os
-from sklearn.metrics import confusion_matrix, accuracy_score, precision_score, recall_score, f1_score
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from evaluation import curves, evaluate, threshold_sweep
+from explain import Explainer
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_PATH = os.path.join(BASE_DIR, "models", "aff_model.pkl")
@@ -12,15 +15,62 @@ VEC_PATH = os.path.join(BASE_DIR, "models", "vectorizer.pkl")
 TEST_DATA_PATH = os.path.join(BASE_DIR, "data", "processed", "test_predictions.csv")
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
 
-def analyze():
+def plot_confusion_matrix(cm, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
+                xticklabels=['Legitimate', 'Fraud'], 
+                yticklabels=['Legitimate', 'Fraud'])
+    plt.xlabel('Predicted Label')
+    plt.ylabel('Actual Label')
+    plt.title('Confusion Matrix: AFF Detection Model')
+    plt.savefig(path)
+    plt.close()
+
+def plot_top_words(top_words, top_scores, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(10, 8))
+    sns.barplot(x=top_scores, y=top_words, palette='Reds_r')
+    plt.xlabel('Log-Likelihood Ratio, Fraud vs Legitimate (Higher = Stronger Indicator)')
+    plt.title(f'Top {len(top_words)} Words Indicating Advance Fee Fraud')
+    plt.savefig(path)
+    plt.close()
+
+def plot_curves(curve, path):
+    import matplotlib.pyplot as plt
+
+    fig, (roc_ax, pr_ax) = plt.subplots(1, 2, figsize=(12, 5))
+    roc_ax.plot(curve['fpr'], curve['tpr'])
+    roc_ax.plot([0, 1], [0, 1], linestyle='--', color='grey')
+    roc_ax.set_xlabel('False Positive Rate')
+    roc_ax.set_ylabel('True Positive Rate')
+    roc_ax.set_title(f"ROC (AUC = {curve['roc_auc']:.4f})")
+    pr_ax.step(curve['recall'], curve['precision'], where='post')
+    pr_ax.set_xlabel('Recall')
+    pr_ax.set_ylabel('Precision')
+    pr_ax.set_title(f"Precision/Recall (AP = {curve['average_precision']:.4f})")
+    fig.savefig(path)
+    plt.close(fig)
+
+def analyze(plots=True):
+    """
+    Metrics, threshold sweep and keywords from the holdout predictions. With
+    plots=False matplotlib and seaborn are never imported, so a headless run
+    only pays for the numbers.
+    """
     os.makedirs(RESULTS_DIR, exist_ok=True)
     print("Loading test results and models...")
     df = pd.read_csv(TEST_DATA_PATH)
     model = joblib.load(MODEL_PATH)
     vectorizer = joblib.load(VEC_PATH)
+    y_true = df['label'].to_numpy()
 
     print("Generating Confusion Matrix...")
-    cm = confusion_matrix(df['label'], df['prediction'])
+    cm, metrics = evaluate(y_true, df['prediction'].to_numpy())
     
     print("\n   [Confusion Matrix]")
     print(f"                    Predicted")
@@ -28,50 +78,58 @@ def analyze():
     print(f"   Actual Legit    {cm[0][0]:5d}  {cm[0][1]:5d}")
     print(f"          Fraud    {cm[1][0]:5d}  {cm[1][1]:5d}")
     
-    acc = accuracy_score(df['label'], df['prediction'])
-    prec = precision_score(df['label'], df['prediction'])
-    rec = recall_score(df['label'], df['prediction'])
-    f1 = f1_score(df['label'], df['prediction'])
-    
     print("\n   [Test Set Metrics]")
-    print(f"   Accuracy:  {acc:.2%}")
-    print(f"   Precision: {prec:.2%}")
-    print(f"   Recall:    {rec:.2%}")
-    print(f"   F1-Score:  {f1:.2%}")
-    
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=['Legitimate', 'Fraud'], 
-                yticklabels=['Legitimate', 'Fraud'])
-    plt.xlabel('Predicted Label')
-    plt.ylabel('Actual Label')
-    plt.title('Confusion Matrix: AFF Detection Model')
-    save_path_cm = os.path.join(RESULTS_DIR, "confusion_matrix.png")
-    plt.savefig(save_path_cm)
-    plt.close()
-    print(f"\n   -> Saved to {save_path_cm}")
+    print(f"   Accuracy:  {metrics['accuracy']:.2%}")
+    print(f"   Precision: {metrics['precision']:.2%}")
+    print(f"   Recall:    {metrics['recall']:.2%}")
+    print(f"   F1-Score:  {metrics['f1']:.2%}")
+
+    if plots:
+        save_path_cm = os.path.join(RESULTS_DIR, "confusion_matrix.png")
+        plot_confusion_matrix(cm, save_path_cm)
+        print(f"\n   -> Saved to {save_path_cm}")
+
+    # Older test_predictions.csv files have no probabilities to sweep.
+    if 'fraud_probability' in df.columns:
+        scores = df['fraud_probability'].to_numpy()
+        curve = curves(y_true, scores)
+        print(f"\n   [Ranking Quality]")
+        print(f"   ROC AUC:           {curve['roc_auc']:.4f}")
+        print(f"   Average Precision: {curve['average_precision']:.4f}")
+
+        sweep = threshold_sweep(y_true, scores, np.round(np.arange(0.1, 1.0, 0.1), 1))
+        print("\n   [Threshold Sweep: fraud if p > threshold]")
+        print("   Threshold | Precision | Recall  | F1      | FPR")
+        print("   " + "-" * 50)
+        for i, threshold in enumerate(sweep['threshold']):
+            print(f"   {threshold:9.1f} | {sweep['precision'][i]:9.2%} | {sweep['recall'][i]:7.2%} | "
+                  f"{sweep['f1'][i]:7.2%} | {sweep['fpr'][i]:.2%}")
+
+        if plots:
+            save_path_curves = os.path.join(RESULTS_DIR, "roc_pr_curves.png")
+            plot_curves(curve, save_path_curves)
+            print(f"\n   -> Saved to {save_path_curves}")
 
     print("\nExtracting Top Fraud Keywords...")
-    feature_names = vectorizer.get_feature_names_out()
-    fraud_prob_sorted_indices = model.feature_log_prob_[1].argsort()[::-1]
-    top_n = 20
-    top_words = [feature_names[i] for i in fraud_prob_sorted_indices[:top_n]]
-    top_scores = [model.feature_log_prob_[1][i] for i in fraud_prob_sorted_indices[:top_n]]
+    explainer = Explainer.from_system(model, vectorizer)
+    if hasattr(vectorizer, 'get_feature_names_out'):
+        # Ranked by log P(w|fraud) - log P(w|legit): words that are merely
+        # common everywhere score high on P(w|fraud) alone.
+        top_n = 20
+        top_words, top_scores = explainer.top_features(top_n)
     
-    print(f"\n   [Top {top_n} Fraud-Indicating Keywords]")
-    print("   Rank | Keyword          | Log Probability")
-    print("   " + "-" * 45)
-    for idx, (word, score) in enumerate(zip(top_words, top_scores), 1):
-        print(f"   {idx:2d}  | {word:15s} | {score:8.4f}")
+        print(f"\n   [Top {top_n} Fraud-Indicating Keywords]")
+        print("   Rank | Keyword          | Log-Likelihood Ratio")
+        print("   " + "-" * 50)
+        for idx, (word, score) in enumerate(zip(top_words, top_scores), 1):
+            print(f"   {idx:2d}  | {word:15s} | {score:8.4f}")
     
-    plt.figure(figsize=(10, 8))
-    sns.barplot(x=top_scores, y=top_words, palette='Reds_r')
-    plt.xlabel('Log Probability (Higher = Stronger Indicator)')
-    plt.title(f'Top {top_n} Words Indicating Advance Fee Fraud')
-    save_path_feat = os.path.join(RESULTS_DIR, "top_fraud_words.png")
-    plt.savefig(save_path_feat)
-    plt.close()
-    print(f"\n   -> Saved to {save_path_feat}")
+        if plots:
+            save_path_feat = os.path.join(RESULTS_DIR, "top_fraud_words.png")
+            plot_top_words(top_words, top_scores, save_path_feat)
+            print(f"\n   -> Saved to {save_path_feat}")
+    else:
+        print("   Skipped: hashing vectorizer has no feature names.")
 
     print("\n--- TEST: SIMULATING A NEW EMAIL ---")
     custom_email = [
@@ -85,6 +143,12 @@ def analyze():
     print(f"Input Text: {custom_email[0]}")
     print(f"Prediction: {result}")
     print(f"Confidence: {confidence:.2%}")
+    top_tokens = explainer.explain(custom_vec)[0]
+    print("Top tokens: " + ", ".join(f"{t['token']} ({t['contribution']:+.2f})" for t in top_tokens))
 
 if __name__ == "__main__":
-    analyze()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate the holdout predictions and plot the results.")
+    parser.add_argument('--no-plots', action='store_true',
+                        help="print numbers only; matplotlib/seaborn are not imported")
+    args = parser.parse_args()
+    analyze(plots=not args.no_plots)
\ No newline at end of file
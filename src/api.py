@@ -1,31 +1,276 @@
+import asyncio
+import hmac
+import json
+import os
+import time
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.requests import ClientDisconnect
 
-from .predict import load_system, predict_message
+from .batching import MicroBatcher, QueueFullError
+from .metrics import SamplingProfiler, ServingMetrics, render_samples
+from .prediction_cache import PredictionCache
+from .text_cleaning import bound_text
+from .predict import (
+    MODEL_PATH, VEC_PATH, COMPILED_PATH, SERVING_CONFIG_PATH, CAMPAIGNS_PATH, load_serving_system,
+    predict_messages,
+)
+
+# Upper bounds for /predict/batch. Both can be overridden per deployment.
+MAX_BATCH_SIZE = int(os.environ.get("AFF_MAX_BATCH_SIZE", "1000"))
+MAX_BATCH_CHARS = int(os.environ.get("AFF_MAX_BATCH_CHARS", str(5_000_000)))
+
+# Hard input limits on every endpoint: characters in one text, and bytes in
+# a request body (in one line for /predict/stream). Larger inputs get 413.
+MAX_TEXT_CHARS = int(os.environ.get("AFF_MAX_TEXT_CHARS", str(1_000_000)))
+MAX_REQUEST_BYTES = int(os.environ.get("AFF_MAX_REQUEST_BYTES", str(16 * 1024 * 1024)))
+
+# Bounded-cost scoring: score only the head and tail of a text, within this
+# many characters and/or tokens (0 disables each limit; both are off by default).
+SCORE_MAX_CHARS = int(os.environ.get("AFF_SCORE_MAX_CHARS", "0"))
+SCORE_MAX_TOKENS = int(os.environ.get("AFF_SCORE_MAX_TOKENS", "0"))
+
+# Micro-batching of concurrent /predict calls (set AFF_MICROBATCH=0 to disable).
+MICROBATCH_ENABLED = os.environ.get("AFF_MICROBATCH", "1") != "0"
+MICROBATCH_WINDOW_MS = float(os.environ.get("AFF_MICROBATCH_WINDOW_MS", "2"))
+MICROBATCH_MAX_ITEMS = int(os.environ.get("AFF_MICROBATCH_MAX_ITEMS", "64"))
+MICROBATCH_QUEUE_SIZE = int(os.environ.get("AFF_MICROBATCH_QUEUE_SIZE", "1024"))
+
+# /predict/stream scores the lines that have arrived in chunks of at most this many.
+STREAM_CHUNK_ITEMS = int(os.environ.get("AFF_STREAM_CHUNK_ITEMS", "256"))
+
+# LRU cache of results keyed by cleaned text (AFF_CACHE_SIZE=0 disables it).
+CACHE_SIZE = int(os.environ.get("AFF_CACHE_SIZE", "10000"))
+CACHE_TTL_SECONDS = float(os.environ.get("AFF_CACHE_TTL_SECONDS", "0"))
+
+# Hot reload: POST /admin/reload and an optional poller that reloads when
+# files in models/ change. Every /admin route needs AFF_ADMIN_TOKEN to be set
+# and sent as X-Admin-Token; without it they answer 404.
+ADMIN_TOKEN = os.environ.get("AFF_ADMIN_TOKEN")
+MODEL_WATCH_SECONDS = float(os.environ.get("AFF_MODEL_WATCH_SECONDS", "0"))
+
+# Request/stage metrics on GET /metrics (AFF_METRICS=0 disables them) and the
+# default rate of the sampling profiler started via /admin/profiler/start,
+# capped so a profile cannot take a noticeable share of a worker's CPU.
+METRICS_ENABLED = os.environ.get("AFF_METRICS", "1") != "0"
+PROFILER_MAX_HZ = 200
+PROFILER_HZ = min(float(os.environ.get("AFF_PROFILER_HZ", "100")), PROFILER_MAX_HZ)
+
+# Set by preload() in a pre-fork parent (see serve.py) so workers start from
+# the already-loaded system instead of each loading their own copy.
+_preloaded_system = None
+
+# perf_counter() at which the current request reached the metrics middleware.
+_request_start = ContextVar("aff_request_start", default=None)
 
 
 class PredictRequest(BaseModel):
-    text: str = Field(..., description="Raw email/SMS/job text to classify")
+    text: str = Field(
+        ..., description=f"Raw email/SMS/job text to classify (at most {MAX_TEXT_CHARS} characters)"
+    )
+
+
+class TokenContribution(BaseModel):
+    token: str
+    weight: float = Field(
+        ..., description="The token's feature value: its count, or its TF-IDF weight with a tfidf featurizer"
+    )
+    contribution: float = Field(
+        ..., description="weight x fraud-vs-legit log-likelihood ratio; positive pushes towards fraud"
+    )
+
+
+class CampaignMatch(BaseModel):
+    id: str
+    similarity: float = Field(..., description="Estimated Jaccard similarity of word 3-shingles")
+    size: int = Field(..., description="Messages of this campaign in the training data")
+    fraud_share: float = Field(..., description="Fraction of those messages labelled fraud")
 
 
 class PredictResponse(BaseModel):
     label: str
     confidence: float
+    model_version: str
+    top_tokens: list[TokenContribution] | None = Field(
+        default=None,
+        description="Tokens that contributed most to the score, largest |contribution| first "
+                    "(AFF_EXPLAIN_TOP_K of them; null when that is 0)",
+    )
+    campaign: CampaignMatch | None = Field(
+        default=None,
+        description="Known near-duplicate campaign this text belongs to, if any",
+    )
+    scored_fraction: float = Field(
+        default=1.0,
+        description="Fraction of the text's characters that were scored; below 1 when only its head "
+                    "and tail were (AFF_SCORE_MAX_CHARS / AFF_SCORE_MAX_TOKENS)",
+    )
+
+
+class BatchPredictRequest(BaseModel):
+    texts: list[str] = Field(
+        ...,
+        description=(
+            f"Raw texts to classify in one call (at most {MAX_BATCH_SIZE} items, "
+            f"{MAX_TEXT_CHARS} characters each and {MAX_BATCH_CHARS} characters in total)"
+        ),
+    )
+
+
+class BatchPredictResponse(BaseModel):
+    count: int
+    model_version: str
+    results: list[PredictResponse]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Load the AFF model and vectorizer once for the application lifespan.
-    Stored on the app.state object for reuse across requests.
+    Stored on the app.state object for reuse across requests; /admin/reload
+    and the optional file watcher replace it without a restart.
     """
-    model, vectorizer = load_system()
-    app.state.model = model
-    app.state.vectorizer = vectorizer
+    app.state.system = None
+    app.state.reload_lock = asyncio.Lock()
+    app.state.metrics = ServingMetrics() if METRICS_ENABLED else None
+    app.state.profiler = SamplingProfiler(hz=PROFILER_HZ)
+    app.state.cache = None
+    if CACHE_SIZE > 0:
+        app.state.cache = PredictionCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL_SECONDS)
+    _install_system(_preloaded_system or load_serving_system())
+    app.state.batcher = None
+    if MICROBATCH_ENABLED:
+        app.state.batcher = MicroBatcher(
+            _score_batch,
+            max_batch_size=MICROBATCH_MAX_ITEMS,
+            max_wait_ms=MICROBATCH_WINDOW_MS,
+            max_queue_size=MICROBATCH_QUEUE_SIZE,
+        )
+        await app.state.batcher.start()
+    watcher = None
+    if MODEL_WATCH_SECONDS > 0:
+        watcher = asyncio.create_task(_watch_models(MODEL_WATCH_SECONDS))
     yield
+    if watcher is not None:
+        watcher.cancel()
+    if app.state.batcher is not None:
+        await app.state.batcher.stop()
+    app.state.profiler.stop()
+
+
+def preload():
+    """
+    Load the serving system once in the current process. Call before forking
+    workers: they inherit it and share its pages copy-on-write.
+    """
+    global _preloaded_system
+    _preloaded_system = load_serving_system()
+    return _preloaded_system
+
+
+def _install_system(system):
+    """
+    Publish a loaded system with a single attribute assignment. Handlers read
+    app.state.system once and keep that reference, so in-flight requests finish
+    on the pair they started with while new ones see the replacement.
+    """
+    if app.state.cache is not None and system is not None:
+        # Entries are namespaced by version; old results can never be served.
+        app.state.cache.reset(namespace=system.version)
+    app.state.system = system
+
+
+def _cache_for(system):
+    cache = app.state.cache
+    if cache is None or cache.namespace != system.version:
+        return None
+    return cache
+
+
+def _bound_texts(texts, metrics):
+    """Texts cut down to their scored head and tail, and the fraction of each that was kept."""
+    start = time.perf_counter()
+    bounded = [bound_text(text, SCORE_MAX_CHARS, SCORE_MAX_TOKENS) for text in texts]
+    fractions = [scored / len(text) if text else 1.0 for text, (_, scored) in zip(texts, bounded)]
+    if metrics is not None:
+        metrics.observe_stage("truncate", time.perf_counter() - start)
+        truncated = sum(fraction < 1.0 for fraction in fractions)
+        if truncated:
+            metrics.truncated.inc(amount=truncated)
+    return [text for text, _ in bounded], fractions
+
+
+def _score_with(system, texts):
+    metrics = app.state.metrics
+    if metrics is not None:
+        metrics.observe_batch(texts)
+    fractions = [1.0] * len(texts)
+    if SCORE_MAX_CHARS or SCORE_MAX_TOKENS:
+        texts, fractions = _bound_texts(texts, metrics)
+    results = predict_messages(
+        system.model, system.vectorizer, texts, _cache_for(system), system.threshold, system.explainer,
+        system.campaigns, metrics,
+    )
+    return [
+        (label, confidence, system.version, *(extra or (None, None)), fraction)
+        for (label, confidence, *extra), fraction in zip(results, fractions)
+    ]
+
+
+def _score_batch(texts):
+    return _score_with(_require_model(), texts)
+
+
+async def reload_system():
+    """
+    Load the artifacts currently on disk in a worker thread, validate them and
+    swap them in. Returns (previous_version, new_version); raises on failure,
+    leaving the serving system untouched.
+    """
+    async with app.state.reload_lock:
+        previous = app.state.system
+        system = await asyncio.to_thread(load_serving_system)
+        if system is None:
+            raise FileNotFoundError("Model files not found; keeping the current model.")
+        if previous is not None and system.version == previous.version:
+            return previous.version, previous.version
+        _install_system(system)
+        return (previous.version if previous else None), system.version
+
+
+def _artifact_mtimes():
+    mtimes = {}
+    for path in (MODEL_PATH, VEC_PATH, COMPILED_PATH, SERVING_CONFIG_PATH, CAMPAIGNS_PATH):
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[path] = None
+    return mtimes
+
+
+async def _watch_models(interval):
+    last = _artifact_mtimes()
+    while True:
+        await asyncio.sleep(interval)
+        current = _artifact_mtimes()
+        if current == last:
+            continue
+        # Give the writer a moment to finish, then reload; a failed reload
+        # keeps the old model and is retried on the next change.
+        await asyncio.sleep(interval)
+        last = _artifact_mtimes()
+        try:
+            previous, new = await reload_system()
+            if previous != new:
+                print(f"Reloaded model {previous} -> {new}")
+        except Exception as e:
+            print(f"Model reload failed, keeping current model: {e}")
 
 
 app = FastAPI(
@@ -38,6 +283,88 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+class _MetricsMiddleware:
+    """
+    Counts and times every HTTP request by route and status code. Written as
+    plain ASGI rather than BaseHTTPMiddleware so it adds no task or body
+    buffering per request, and times streamed responses to their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = None
+
+    async def __call__(self, scope, receive, send):
+        metrics = getattr(scope["app"].state, "metrics", None) if scope["type"] == "http" else None
+        if metrics is None:
+            await self.app(scope, receive, send)
+            return
+        if self._paths is None:
+            self._paths = {route.path for route in scope["app"].routes}
+        # Unknown paths share one label so scanners cannot grow the series.
+        path = scope["path"] if scope["path"] in self._paths else "other"
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        token = _request_start.set(start)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_start.reset(token)
+            metrics.observe_request(path, status, time.perf_counter() - start)
+
+
+class _RequestSizeLimit:
+    """
+    Rejects request bodies over MAX_REQUEST_BYTES with 413 before they are
+    parsed: at once when Content-Length says so, otherwise as soon as the
+    chunks read so far exceed it. /predict/stream is exempt; its bodies are
+    unbounded by design and the limit applies to each line instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/predict/stream":
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > MAX_REQUEST_BYTES:
+                await JSONResponse(
+                    {"detail": f"Request body exceeds {MAX_REQUEST_BYTES} bytes."}, status_code=413
+                )(scope, receive, send)
+                return
+        received = 0
+
+        async def receive_bounded():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > MAX_REQUEST_BYTES:
+                # Raised while the handler reads the body; FastAPI answers it.
+                raise HTTPException(status_code=413, detail=f"Request body exceeds {MAX_REQUEST_BYTES} bytes.")
+            return message
+
+        await self.app(scope, receive_bounded, send)
+
+
+def _observe_parsed():
+    """Record the time from request start to the handler: body read, JSON decoding and pydantic validation."""
+    metrics = app.state.metrics
+    start = _request_start.get()
+    if metrics is not None and start is not None:
+        metrics.observe_stage("parse_validate", time.perf_counter() - start)
+
+
+app.add_middleware(_RequestSizeLimit)
+app.add_middleware(_MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -58,33 +385,367 @@ def health_check():
     """
     Lightweight health endpoint for readiness / liveness checks.
     """
-    model_loaded = hasattr(app.state, "model") and hasattr(app.state, "vectorizer")
-    return {"status": "ok", "model_loaded": model_loaded}
+    system = getattr(app.state, "system", None)
+    batcher = getattr(app.state, "batcher", None)
+    return {
+        "status": "ok",
+        "model_loaded": system is not None,
+        "model_version": system.version if system is not None else None,
+        "model_loaded_at": system.loaded_at if system is not None else None,
+        "threshold": system.threshold if system is not None else None,
+        "campaigns": len(system.campaigns) if system is not None and system.campaigns is not None else None,
+        "limits": {
+            "max_batch_size": MAX_BATCH_SIZE,
+            "max_batch_chars": MAX_BATCH_CHARS,
+            "max_text_chars": MAX_TEXT_CHARS,
+            "max_request_bytes": MAX_REQUEST_BYTES,
+            "score_max_chars": SCORE_MAX_CHARS or None,
+            "score_max_tokens": SCORE_MAX_TOKENS or None,
+        },
+        "microbatch": batcher.stats() if batcher is not None else None,
+    }
+
+
+def _require_model():
+    system = app.state.system
+    if system is None:
+        raise HTTPException(
+            status_code=503,
+            detail=(
+                "Model not loaded. Run train_model.py and commit models/aff_model.pkl "
+                "and models/vectorizer.pkl, or run training in the deploy build step."
+            ),
+        )
+    return system
 
 
 @app.post("/predict", response_model=PredictResponse, tags=["prediction"])
-def predict(request: PredictRequest):
+async def predict(request: PredictRequest):
     """
     Classify a single piece of text as SCAM/FRAUD or LEGITIMATE.
+
+    Concurrent calls are coalesced by the micro-batcher and scored together;
+    with micro-batching disabled each call is scored on its own in the
+    thread pool. `top_tokens` explains the score from the nonzero entries of
+    the message's own count row, so it adds no extra vectorization.
     """
+    _observe_parsed()
     if not request.text.strip():
         raise HTTPException(status_code=400, detail="Text must not be empty.")
-
-    if app.state.model is None or app.state.vectorizer is None:
+    if len(request.text) > MAX_TEXT_CHARS:
         raise HTTPException(
-            status_code=503,
-            detail=(
-                "Model not loaded. Run train_model.py and commit models/aff_model.pkl "
-                "and models/vectorizer.pkl, or run training in the deploy build step."
-            ),
+            status_code=413,
+            detail=f"Text has {len(request.text)} characters; the limit is {MAX_TEXT_CHARS}.",
         )
 
+    system = _require_model()
+
     try:
-        label, confidence = predict_message(app.state.model, app.state.vectorizer, request.text)
+        if app.state.batcher is not None:
+            label, confidence, version, top_tokens, campaign, scored_fraction = await app.state.batcher.submit(
+                request.text
+            )
+        else:
+            [(label, confidence, version, top_tokens, campaign, scored_fraction)] = await run_in_threadpool(
+                _score_with, system, [request.text]
+            )
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many pending predictions; retry shortly.",
+            headers={"Retry-After": "1"},
+        )
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return PredictResponse(label=label, confidence=float(confidence))
+    return PredictResponse(
+        label=label, confidence=float(confidence), model_version=version, top_tokens=top_tokens,
+        campaign=campaign, scored_fraction=scored_fraction,
+    )
+
+
+@app.post("/predict/batch", response_model=BatchPredictResponse, tags=["prediction"])
+def predict_batch(request: BatchPredictRequest):
+    """
+    Classify many texts in one request. The batch is vectorized into a single
+    sparse matrix and scored in one pass, so per-message overhead is paid once.
+    """
+    _observe_parsed()
+    texts = request.texts
+    if not texts:
+        raise HTTPException(status_code=400, detail="texts must not be empty.")
+    if len(texts) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(texts)} texts; the limit is {MAX_BATCH_SIZE}.",
+        )
+    too_long = [i for i, text in enumerate(texts) if len(text) > MAX_TEXT_CHARS]
+    if too_long:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Texts longer than {MAX_TEXT_CHARS} characters (indices: {too_long[:10]}).",
+        )
+    total_chars = sum(len(text) for text in texts)
+    if total_chars > MAX_BATCH_CHARS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {total_chars} characters; the limit is {MAX_BATCH_CHARS}.",
+        )
+    empty = [i for i, text in enumerate(texts) if not text.strip()]
+    if empty:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Text must not be empty (indices: {empty[:10]}).",
+        )
+
+    system = _require_model()
+
+    results = _score_with(system, texts)
+    return BatchPredictResponse(
+        count=len(results),
+        model_version=system.version,
+        results=[
+            PredictResponse(
+                label=label, confidence=float(confidence), model_version=version, top_tokens=top_tokens,
+                campaign=campaign, scored_fraction=scored_fraction,
+            )
+            for label, confidence, version, top_tokens, campaign, scored_fraction in results
+        ],
+    )
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still
+    being read. Under ASGI < 2.4 Starlette watches receive() for a disconnect
+    during streaming, which would swallow the request chunks the generator
+    reads; here the generator is the only consumer of receive().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def _parse_line(line):
+    """Text of one NDJSON input line, or raise ValueError with the reason it is invalid."""
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e.msg}")
+    text = item.get("text") if isinstance(item, dict) else None
+    if not isinstance(text, str):
+        raise ValueError('Expected an object with a string "text" field.')
+    if not text.strip():
+        raise ValueError("Text must not be empty.")
+    if len(text) > MAX_TEXT_CHARS:
+        raise ValueError(f"Text has {len(text)} characters; the limit is {MAX_TEXT_CHARS}.")
+    return text
+
+
+def _score_lines(system, lines, first_line):
+    """Score a micro-chunk of input lines; returns the NDJSON output for all of them."""
+    start = time.perf_counter()
+    texts, errors = [], {}
+    for i, line in enumerate(lines):
+        if line is None or len(line) > MAX_REQUEST_BYTES:
+            errors[i] = f"Line exceeds {MAX_REQUEST_BYTES} bytes."
+            continue
+        try:
+            texts.append(_parse_line(line))
+        except ValueError as e:
+            errors[i] = str(e)
+    metrics = app.state.metrics
+    if metrics is not None:
+        metrics.observe_stage("parse_validate", time.perf_counter() - start)
+        if errors:
+            metrics.stream_line_errors.inc(amount=len(errors))
+    results = iter(_score_with(system, texts) if texts else [])
+    out = []
+    for i in range(len(lines)):
+        if i in errors:
+            out.append({"line": first_line + i, "error": errors[i]})
+        else:
+            label, confidence, version, top_tokens, campaign, scored_fraction = next(results)
+            result = {"label": label, "confidence": float(confidence), "model_version": version}
+            if top_tokens is not None:
+                result["top_tokens"] = top_tokens
+            if campaign is not None:
+                result["campaign"] = campaign
+            if scored_fraction < 1.0:
+                result["scored_fraction"] = scored_fraction
+            out.append(result)
+    return "".join(json.dumps(item) + "\n" for item in out).encode()
+
+
+async def _stream_results(system, body):
+    # Pieces of the unfinished last line, joined once when its newline
+    # arrives; only each new chunk is searched, so a long line costs linear
+    # time on the event loop instead of a copy and re-scan per chunk.
+    pending, pending_bytes = [], 0
+    # Set while discarding a line that outgrew MAX_REQUEST_BYTES, so the
+    # buffer stays bounded; the line is answered with an error once it ends.
+    oversized = False
+    line_no = 0
+    try:
+        async for data in body:
+            end = data.find(b"\n")
+            if end < 0:
+                if not oversized:
+                    pending.append(data)
+                    pending_bytes += len(data)
+                    if pending_bytes > MAX_REQUEST_BYTES:
+                        pending, pending_bytes, oversized = [], 0, True
+                continue
+            first = None if oversized else b"".join(pending) + data[:end]
+            *rest, tail = data[end + 1:].split(b"\n")
+            pending, pending_bytes, oversized = [tail], len(tail), False
+            if pending_bytes > MAX_REQUEST_BYTES:
+                pending, pending_bytes, oversized = [], 0, True
+            lines = [line for line in [first, *rest] if line is None or line.strip()]
+            for start in range(0, len(lines), STREAM_CHUNK_ITEMS):
+                chunk = lines[start:start + STREAM_CHUNK_ITEMS]
+                yield await run_in_threadpool(_score_lines, system, chunk, line_no)
+                line_no += len(chunk)
+    except ClientDisconnect:
+        return
+    pending = b"".join(pending)
+    if oversized or pending.strip():
+        yield await run_in_threadpool(_score_lines, system, [None if oversized else pending], line_no)
+
+
+@app.post("/predict/stream", tags=["prediction"])
+async def predict_stream(request: Request):
+    """
+    Classify a stream of newline-delimited JSON objects (`{"text": "..."}` per
+    line) and stream back one JSON result line per input line, in order.
+
+    Lines are scored in micro-chunks of up to AFF_STREAM_CHUNK_ITEMS as they
+    arrive, so results flow back while the client is still sending. Lines are
+    parsed with json.loads rather than a pydantic model, and the model is
+    resolved once, so the whole stream is scored by the same model version.
+    An invalid line yields `{"line": n, "error": "..."}` (n counts non-blank
+    lines from 0) instead of failing the stream.
+    """
+    system = _require_model()
+    return _DuplexStreamingResponse(_stream_results(system, request.stream()), media_type="application/x-ndjson")
+
+
+@app.get("/cache/stats", tags=["system"])
+def cache_stats():
+    """
+    Hit/miss/eviction counters of the prediction cache.
+    """
+    cache = getattr(app.state, "cache", None)
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["system"])
+def prometheus_metrics():
+    """
+    Request, error, batch-size and input-length counters and per-stage latency
+    histograms in the Prometheus text format. Each worker process keeps its
+    own, like the prediction cache.
+    """
+    registry = app.state.metrics
+    if registry is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (AFF_METRICS=0).")
+    system = app.state.system
+    cache = app.state.cache.stats() if app.state.cache is not None else None
+    batcher = app.state.batcher
+    gauges = [
+        *render_samples(
+            "aff_model_info", "Loaded model version (value is always 1).", "gauge",
+            {(("version", system.version),): 1} if system is not None else {},
+        ),
+        *render_samples(
+            "aff_model_loaded_at_seconds", "Unix time the serving model was loaded.", "gauge",
+            {(): system.loaded_at if system is not None else None},
+        ),
+        *render_samples(
+            "aff_microbatch_pending", "Requests waiting for the micro-batcher.", "gauge",
+            {(): batcher.stats()["pending"] if batcher is not None else None},
+        ),
+        *render_samples(
+            "aff_microbatch_rejected_total", "Requests rejected with 503 because the queue was full.", "counter",
+            {(): batcher.rejected if batcher is not None else None},
+        ),
+        *render_samples(
+            "aff_cache_entries", "Entries in the prediction cache.", "gauge",
+            {(): cache["size"] if cache else None},
+        ),
+        *render_samples(
+            "aff_cache_lookups_total", "Prediction-cache lookups by result.", "counter",
+            {(("result", "hit"),): cache["hits"], (("result", "miss"),): cache["misses"]} if cache else {},
+        ),
+        *render_samples(
+            "aff_profiler_running", "1 while the sampling profiler is running.", "gauge",
+            {(): int(app.state.profiler.running)},
+        ),
+    ]
+    return PlainTextResponse(registry.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+def _check_admin_token(x_admin_token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled; set AFF_ADMIN_TOKEN.")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+
+@app.post("/admin/profiler/start", tags=["system"])
+def profiler_start(hz: float | None = None, x_admin_token: str | None = Header(default=None)):
+    """
+    Start the sampling profiler (AFF_PROFILER_HZ samples per second unless
+    `hz` is given). It only reads thread stacks, so it is safe on a live
+    server; starting discards the previous profile.
+    """
+    _check_admin_token(x_admin_token)
+    if hz is not None and not 0 < hz <= PROFILER_MAX_HZ:
+        raise HTTPException(status_code=400, detail=f"hz must be in (0, {PROFILER_MAX_HZ}].")
+    started = app.state.profiler.start(hz)
+    return {"started": started, **app.state.profiler.stats()}
+
+
+@app.post("/admin/profiler/stop", tags=["system"])
+def profiler_stop(top: int = 20, x_admin_token: str | None = Header(default=None)):
+    """Stop the sampling profiler and return the functions it saw most often."""
+    _check_admin_token(x_admin_token)
+    stopped = app.state.profiler.stop()
+    return {"stopped": stopped, **app.state.profiler.stats(), "top": app.state.profiler.top(top)}
+
+
+@app.get("/admin/profiler", tags=["system"])
+def profiler_report(format: str = "json", top: int = 20, x_admin_token: str | None = Header(default=None)):
+    """
+    The current (or last) profile: `format=json` for the top functions by
+    samples on top of the stack, `format=folded` for collapsed stacks to feed
+    to flamegraph.pl or speedscope.
+    """
+    _check_admin_token(x_admin_token)
+    profiler = app.state.profiler
+    if format == "folded":
+        return PlainTextResponse(profiler.folded())
+    if format != "json":
+        raise HTTPException(status_code=400, detail='format must be "json" or "folded".')
+    return {**profiler.stats(), "top": profiler.top(top)}
+
+
+@app.post("/admin/reload", tags=["system"])
+async def admin_reload(x_admin_token: str | None = Header(default=None)):
+    """
+    Load the model files currently in models/, validate that model and
+    vectorizer match, and swap them in without dropping requests.
+    """
+    _check_admin_token(x_admin_token)
+    try:
+        previous, new = await reload_system()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=409, detail=f"Reload rejected: {e}")
+    return {"reloaded": previous != new, "previous_version": previous, "model_version": new}
 
 
 def get_app() -> FastAPI:
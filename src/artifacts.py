@@ -0,0 +1,43 @@
+import hashlib
+import os
+import shutil
+
+# Helpers for the artifact directories under models/ (aff_scorer/,
+# campaigns/) and for content-hashing files. Kept free of NumPy so any
+# module can import them.
+
+
+def remove_path(path):
+    """Delete a file or directory tree; a missing path is not an error."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def atomic_replace_dir(tmp_path, path):
+    """
+    Swap a fully written directory `tmp_path` in as `path`. The previous copy
+    is moved to `path`.old first, so readers see either the old or the new
+    directory but never a half-written one. Returns `path`.
+    """
+    old_path = path + ".old"
+    remove_path(old_path)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    remove_path(old_path)
+    return path
+
+
+def hash_file(path, h=None):
+    """
+    Feed the bytes of `path` into the hash object `h` (a new sha256 by
+    default) in 1 MiB blocks, so large files are never read whole. Returns
+    `h`; pass the same object for several files to hash them together.
+    """
+    h = hashlib.sha256() if h is None else h
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h
@@ -0,0 +1,110 @@
+import asyncio
+
+
+class QueueFullError(Exception):
+    """Raised by MicroBatcher.submit when the pending queue is at capacity."""
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-text requests and scores them as one batch.
+
+    A background task takes the first queued request, then keeps collecting
+    until either `max_batch_size` items are waiting or `max_wait_ms` has passed
+    since that first item, and hands the whole batch to `score_fn` in a worker
+    thread. Results are fanned back out to the awaiting callers in order.
+    While a batch is being scored, new requests accumulate for the next one.
+    When traffic is light (the previous batch held a single item and nothing
+    else is queued) the window is skipped, so an idle server adds no latency.
+
+    Backpressure: at most `max_queue_size` requests may wait; beyond that
+    submit() raises QueueFullError immediately instead of queueing unboundedly.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=2.0, max_queue_size=1024):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self._last_batch_size = 1
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, text):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((text, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"{self.max_queue_size} requests already pending")
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        if self._last_batch_size == 1 and self._queue.empty():
+            return batch
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            self._last_batch_size = len(batch)
+            # Callers that gave up (e.g. client disconnected) are not scored.
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await asyncio.to_thread(self.score_fn, [text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_queue_size": self.max_queue_size,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,293 @@
+import csv
+import json
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from predict import artifact_version, fraud_probabilities, load_system, load_threshold
+
+DEFAULT_CHUNKSIZE = 10_000
+FORMATS = ("mbox", "csv", "jsonl")
+# Malformed JSON lines reported one by one before only a total is printed.
+MAX_BAD_LINE_WARNINGS = 5
+
+# Every reader yields (offset, next_offset, text), where offsets are byte
+# positions in the input. next_offset of the last message written is where a
+# resumed run seeks to, so no input has to be re-read or re-scored.
+
+class _LineReader:
+    """Decoded lines of a binary file that keeps track of the byte offset consumed so far."""
+    def __init__(self, f, encoding):
+        self.f = f
+        self.encoding = encoding
+        self.offset = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode(self.encoding, "replace")
+
+def iter_mbox(path, start=0, encoding="utf-8", text_column=None):
+    """Messages of an mbox file: a 'From ' line at the start of the file or after a blank line starts a new one."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = msg_start = start
+        lines = []
+        prev_blank = True
+        for line in f:
+            if prev_blank and line.startswith(b"From ") and lines:
+                yield msg_start, offset, b"".join(lines).decode(encoding, "replace")
+                lines = []
+                msg_start = offset
+            lines.append(line)
+            offset += len(line)
+            prev_blank = not line.strip()
+        if lines:
+            yield msg_start, offset, b"".join(lines).decode(encoding, "replace")
+
+def iter_csv(path, start=0, encoding="utf-8", text_column="text"):
+    """Rows of a CSV file with a header; quoted fields may span lines."""
+    with open(path, "rb") as f:
+        lines = _LineReader(f, encoding)
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+        if text_column not in header:
+            raise ValueError(f"{path} has no {text_column!r} column (columns: {header}).")
+        index = header.index(text_column)
+        if start > lines.offset:
+            f.seek(start)
+            lines.offset = start
+        offset = lines.offset
+        for row in reader:
+            text = row[index] if index < len(row) else ""
+            yield offset, lines.offset, text
+            offset = lines.offset
+
+def iter_jsonl(path, start=0, encoding="utf-8", text_column="text"):
+    """
+    Objects of a JSON-lines file; blank lines are skipped. A line that is not
+    a JSON object is scored as empty text, like a missing text field, so one
+    bad line cannot stop a run (or every resume of it) at the same offset.
+    """
+    bad_lines = 0
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            next_offset = offset + len(line)
+            if line.strip():
+                try:
+                    text = json.loads(line.decode(encoding, "replace")).get(text_column)
+                except (ValueError, AttributeError):
+                    bad_lines += 1
+                    if bad_lines <= MAX_BAD_LINE_WARNINGS:
+                        print(f"   Line at byte {offset:,} is not a JSON object; scoring it as empty text.")
+                    text = None
+                yield offset, next_offset, text if isinstance(text, str) else ""
+            offset = next_offset
+    if bad_lines:
+        print(f"   {bad_lines:,} lines were not JSON objects and were scored as empty text.")
+
+READERS = {"mbox": iter_mbox, "csv": iter_csv, "jsonl": iter_jsonl}
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".mbox", ".mbx"):
+        return "mbox"
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format ({', '.join(FORMATS)}).")
+
+def iter_chunks(records, chunksize):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+_worker_system = None
+
+def _init_worker():
+    global _worker_system
+    _worker_system = load_system()
+
+def _score_chunk(texts, threshold, system=None):
+    model, vectorizer = system or _worker_system
+    return fraud_probabilities(model, vectorizer, texts, threshold)
+
+class _Progress:
+    """Checkpoint of a run: how many parts are complete and where the input resumes."""
+    def __init__(self, parts_dir):
+        self.path = os.path.join(parts_dir, "progress.json")
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+def _is_parquet(path):
+    return path.endswith(".parquet")
+
+def _part_path(parts_dir, index, out_path):
+    return os.path.join(parts_dir, f"part-{index:06d}" + (".parquet" if _is_parquet(out_path) else ".csv"))
+
+def _write_part(path, offsets, predictions, fraud_proba):
+    df = pd.DataFrame({
+        "offset": pd.Series(offsets, dtype="int64"),
+        "label": ["SCAM / FRAUD" if p == 1 else "LEGITIMATE" for p in predictions],
+        "fraud_probability": pd.Series(fraud_proba, dtype="float64"),
+    })
+    tmp = path + ".tmp"
+    if _is_parquet(path):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+def _merge_parts(parts_dir, n_parts, out_path):
+    """Concatenate the part files into out_path one part at a time."""
+    if n_parts == 0:
+        _write_part(out_path, [], [], [])
+        return
+    tmp = out_path + ".tmp"
+    paths = [_part_path(parts_dir, i, out_path) for i in range(n_parts)]
+    if _is_parquet(out_path):
+        import pyarrow.parquet as pq
+        writer = None
+        for path in paths:
+            table = pq.read_table(path)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema)
+            writer.write_table(table)
+        writer.close()
+    else:
+        with open(tmp, "wb") as out:
+            out.write(b"offset,label,fraud_probability\n")
+            for path in paths:
+                with open(path, "rb") as f:
+                    f.readline()
+                    shutil.copyfileobj(f, out)
+    os.replace(tmp, out_path)
+
+def score_file(in_path, out_path, fmt=None, text_column="text", chunksize=DEFAULT_CHUNKSIZE,
+               workers=1, encoding="utf-8", restart=False):
+    """
+    Stream `in_path`, score it in chunks of `chunksize` messages and write one
+    row per message (offset, label, fraud_probability) to `out_path`.
+
+    Each scored chunk is written as a part file under `<out_path>.parts/` and
+    then recorded in its progress.json, so an interrupted run picks up after
+    the last completed chunk. Parts are merged into `out_path` at the end.
+    Memory is bounded by the chunks in flight (two per worker), not by the
+    input size. A resume is refused if the input file or model changed since
+    the run started; pass restart=True to discard the earlier progress.
+    """
+    fmt = fmt or detect_format(in_path)
+    if fmt not in READERS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    system = load_system()
+    if system[0] is None:
+        raise FileNotFoundError("Model files not found; run train_model.py first.")
+    threshold = load_threshold()
+
+    stat = os.stat(in_path)
+    run = {
+        "input": os.path.abspath(in_path),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "format": fmt,
+        "text_column": text_column,
+        "model_version": artifact_version(),
+    }
+    parts_dir = out_path + ".parts"
+    if restart and os.path.isdir(parts_dir):
+        shutil.rmtree(parts_dir)
+    os.makedirs(parts_dir, exist_ok=True)
+    progress = _Progress(parts_dir)
+    state = progress.load()
+    if state is None:
+        state = {**run, "parts": 0, "next_offset": 0, "messages": 0}
+        progress.save(state)
+    elif any(state[k] != v for k, v in run.items()):
+        changed = [k for k, v in run.items() if state[k] != v]
+        raise ValueError(f"Cannot resume {out_path}: {', '.join(changed)} changed since the run started. "
+                         f"Pass --restart to score from the beginning.")
+    else:
+        print(f"Resuming after {state['messages']:,} messages (byte {state['next_offset']:,}).")
+    # A part written after the last checkpoint belongs to a chunk that will be redone.
+    for name in os.listdir(parts_dir):
+        if name.startswith("part-") and int(name[5:11]) >= state["parts"]:
+            os.remove(os.path.join(parts_dir, name))
+
+    records = READERS[fmt](in_path, state["next_offset"], encoding=encoding, text_column=text_column)
+    chunks = iter_chunks(records, chunksize)
+    start = time.perf_counter()
+    last_report = start
+    done = 0
+    start_offset = state["next_offset"]
+
+    def record(chunk, result):
+        nonlocal done, last_report
+        predictions, fraud_proba = result
+        _write_part(_part_path(parts_dir, state["parts"], out_path),
+                    [r[0] for r in chunk], predictions, fraud_proba)
+        state["parts"] += 1
+        state["next_offset"] = chunk[-1][1]
+        state["messages"] += len(chunk)
+        progress.save(state)
+        done += len(chunk)
+        now = time.perf_counter()
+        if now - last_report >= 2.0:
+            last_report = now
+            elapsed = now - start
+            mb = (state["next_offset"] - start_offset) / 1e6
+            print(f"   {state['messages']:,} messages, {state['next_offset'] / max(stat.st_size, 1):.1%} of input, "
+                  f"{done / elapsed:,.0f} msg/s, {mb / elapsed:.1f} MB/s")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(_score_chunk, [r[2] for r in chunk], threshold)))
+                if len(pending) >= 2 * workers:
+                    chunk, future = pending.popleft()
+                    record(chunk, future.result())
+            while pending:
+                chunk, future = pending.popleft()
+                record(chunk, future.result())
+    else:
+        for chunk in chunks:
+            record(chunk, _score_chunk([r[2] for r in chunk], threshold, system))
+
+    _merge_parts(parts_dir, state["parts"], out_path)
+    shutil.rmtree(parts_dir)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {state['messages']:,} messages ({done:,} this run) in {elapsed:.1f}s "
+          f"({done / elapsed if elapsed else 0:,.0f} msg/s) -> {out_path}")
+    return state["messages"]
@@ -0,0 +1,271 @@
+import itertools
+import json
+import os
+import re
+
+import numpy as np
+
+from artifacts import atomic_replace_dir, remove_path
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPILED_PATH = os.path.join(BASE_DIR, "models", "aff_scorer")
+FORMAT_VERSION = 3
+# Version 2 artifacts (plain unigram counts) load unchanged.
+READABLE_FORMATS = (2, 3)
+
+# CountVectorizer's default token pattern; the exported vocabulary only makes
+# sense if serving splits text exactly the way training did.
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# Distinct tokens are cast to the vocabulary's fixed-width dtype for the
+# lookup; doing that in blocks keeps the temporary arrays small for very
+# large batches.
+LOOKUP_BLOCK = 1 << 16
+
+
+class SparseCounts:
+    """
+    Minimal CSR matrix of token counts. Uses the same attribute names as
+    scipy.sparse.csr_matrix (indptr, indices, data, shape) so downstream code
+    can read rows from either without caring which one it got.
+    """
+
+    def __init__(self, indptr, indices, data, n_features):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = (len(indptr) - 1, n_features)
+
+
+class CompiledNB:
+    """
+    Dependency-light replacement for the CountVectorizer (or TfidfVectorizer)
+    + MultinomialNB pair.
+
+    For two classes, MultinomialNB's decision reduces to
+        logit = (log_prior[1] - log_prior[0]) + counts . (flp[1] - flp[0])
+    so serving only needs the vocabulary, one weight per feature and a bias.
+    The object plays both roles expected by predict_messages(): it has
+    transform() like the vectorizer and predict_proba()/classes_ like the model.
+
+    The vocabulary is a sorted fixed-width string array and tokens are looked
+    up with np.searchsorted, so no per-process dict has to be built: both
+    arrays can be memory-mapped and their pages shared by every worker.
+
+    Word n-grams are formed the way CountVectorizer forms them (stop words
+    dropped first, then joined with single spaces), and TF-IDF weighting
+    (sublinear tf, idf, row norm) is applied to the counts when exported.
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, vocabulary, log_ratio, bias, token_pattern=DEFAULT_TOKEN_PATTERN,
+                 ngram_range=(1, 1), stop_words=None, idf=None, sublinear_tf=False, norm=None):
+        self.vocabulary = vocabulary
+        self.log_ratio = log_ratio
+        self.bias = float(bias)
+        self.n_features = len(log_ratio)
+        self.token_pattern = token_pattern
+        self._token_re = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = frozenset(stop_words or ())
+        self.idf = idf
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        # Longer tokens cannot be in the vocabulary, and casting them to the
+        # array's width would truncate them into false matches.
+        self._max_token_len = vocabulary.dtype.itemsize // 4
+
+    @classmethod
+    def load(cls, path=COMPILED_PATH, mmap=True):
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") not in READABLE_FORMATS:
+            raise ValueError(f"Unsupported compiled scorer format {meta.get('format')!r} in {path}.")
+        idf_path = os.path.join(path, "idf.npy")
+        return cls(
+            vocabulary=np.load(os.path.join(path, "vocabulary.npy"), mmap_mode=mode),
+            log_ratio=np.load(os.path.join(path, "log_ratio.npy"), mmap_mode=mode),
+            bias=meta["bias"],
+            token_pattern=meta["token_pattern"],
+            ngram_range=meta.get("ngram_range", (1, 1)),
+            stop_words=meta.get("stop_words"),
+            idf=np.load(idf_path, mmap_mode=mode) if os.path.exists(idf_path) else None,
+            sublinear_tf=meta.get("sublinear_tf", False),
+            norm=meta.get("norm"),
+        )
+
+    def _ngrams(self, tokens):
+        """CountVectorizer._word_ngrams: drop stop words, then add the n-grams joined by spaces."""
+        if self.stop_words:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, texts):
+        findall = self._token_re.findall
+        ngrams = self._ngrams if self.ngram_range != (1, 1) else None
+        tokens = []
+        lengths = []
+        for text in texts:
+            doc_tokens = findall(text.lower())
+            if ngrams is not None:
+                doc_tokens = ngrams(doc_tokens)
+            tokens.extend(doc_tokens)
+            lengths.append(len(doc_tokens))
+        n_docs = len(lengths)
+        n_features = self.n_features
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        if not tokens:
+            return SparseCounts(indptr, np.zeros(0, dtype=np.int64), np.zeros(0), n_features)
+
+        # A batch repeats its common words thousands of times, so each distinct
+        # token is looked up once. `first` maps a token to the index of its
+        # first occurrence, and every occurrence takes that token's position.
+        first = {}
+        occurrence = np.fromiter(map(first.setdefault, tokens, itertools.count()), dtype=np.int64,
+                                 count=len(tokens))
+        distinct = list(first)
+        if len(distinct) <= LOOKUP_BLOCK:
+            distinct_pos = self._positions(distinct)
+        else:
+            distinct_pos = np.concatenate([
+                self._positions(distinct[i:i + LOOKUP_BLOCK]) for i in range(0, len(distinct), LOOKUP_BLOCK)
+            ])
+        pos = np.empty(len(tokens), dtype=np.int64)
+        pos[np.fromiter(first.values(), dtype=np.int64, count=len(first))] = distinct_pos
+        pos = pos[occurrence]
+        known = pos >= 0
+        rows = np.repeat(np.arange(n_docs), lengths)[known]
+        # One np.unique over (row, feature) keys yields CSR order and counts.
+        keys, counts = np.unique(rows * n_features + pos[known], return_counts=True)
+        np.cumsum(np.bincount(keys // n_features, minlength=n_docs), out=indptr[1:])
+        indices = keys % n_features
+        return SparseCounts(indptr, indices, self._weight(counts.astype(np.float64), indices, indptr), n_features)
+
+    def _weight(self, data, indices, indptr):
+        """TfidfTransformer's weighting of CSR counts; counts pass through unchanged without it."""
+        if self.sublinear_tf:
+            np.log(data, out=data)
+            data += 1.0
+        if self.idf is not None:
+            data *= self.idf[indices]
+        if self.norm is not None:
+            rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+            values = data * data if self.norm == "l2" else np.abs(data)
+            norms = np.bincount(rows, weights=values, minlength=len(indptr) - 1)
+            if self.norm == "l2":
+                norms = np.sqrt(norms)
+            norms[norms == 0.0] = 1.0
+            data /= norms[rows]
+        return data
+
+    def _positions(self, tokens):
+        """Feature index of each token, or -1 for tokens not in the vocabulary."""
+        fits = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens)) <= self._max_token_len
+        tokens = np.array(tokens, dtype=self.vocabulary.dtype)
+        pos = np.minimum(np.searchsorted(self.vocabulary, tokens), self.n_features - 1)
+        return np.where((self.vocabulary[pos] == tokens) & fits, pos, -1)
+
+    def decision_function(self, X):
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        weights = X.data * self.log_ratio[X.indices]
+        return self.bias + np.bincount(rows, weights=weights, minlength=X.shape[0])
+
+    def predict_proba(self, X):
+        logit = self.decision_function(X)
+        # log-sigmoid via logaddexp stays finite for very long documents.
+        fraud = np.exp(-np.logaddexp(0.0, -logit))
+        legit = np.exp(-np.logaddexp(0.0, logit))
+        return np.column_stack([legit, fraud])
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(np.int64)
+
+    def get_feature_names_out(self):
+        return np.asarray(self.vocabulary, dtype=object)
+
+
+def export_compiled(model, vectorizer, path=COMPILED_PATH):
+    """
+    Flatten a fitted CountVectorizer or TfidfVectorizer + binary MultinomialNB
+    into a directory of plain .npy arrays plus meta.json that CompiledNB can
+    memory-map with nothing but NumPy. The directory is built next to `path`
+    and renamed into place so readers never see a half-written artifact.
+    """
+    params = vectorizer.get_params()
+    ngram_range = tuple(params.get("ngram_range", (1, 1)))
+    if (
+        not hasattr(vectorizer, "vocabulary_")
+        or params.get("analyzer") != "word"
+        or ngram_range[0] < 1
+        or params.get("binary")
+        or not params.get("lowercase")
+        or params.get("tokenizer") is not None
+        or params.get("preprocessor") is not None
+        or params.get("strip_accents") is not None
+    ):
+        raise ValueError("Only plain word n-gram CountVectorizer/TfidfVectorizer vocabularies can be compiled.")
+    if params.get("norm") not in (None, "l1", "l2"):
+        raise ValueError(f"Unsupported TF-IDF norm {params.get('norm')!r}.")
+    if list(model.classes_) != [0, 1]:
+        raise ValueError(f"Expected binary classes [0, 1], got {list(model.classes_)}.")
+
+    vocabulary = np.array(vectorizer.get_feature_names_out().tolist(), dtype=str)
+    log_ratio = model.feature_log_prob_[1] - model.feature_log_prob_[0]
+    order = np.argsort(vocabulary, kind="stable")
+    bias = model.class_log_prior_[1] - model.class_log_prior_[0]
+
+    tmp_path = path + ".tmp"
+    remove_path(tmp_path)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "vocabulary.npy"), vocabulary[order])
+    np.save(os.path.join(tmp_path, "log_ratio.npy"), np.ascontiguousarray(log_ratio[order], dtype=np.float64))
+    if hasattr(vectorizer, "idf_"):
+        np.save(os.path.join(tmp_path, "idf.npy"), np.ascontiguousarray(vectorizer.idf_[order], dtype=np.float64))
+    # Stop words only matter for n-grams; unigram stop words are simply not in the vocabulary.
+    stop_words = sorted(vectorizer.get_stop_words() or ()) if ngram_range[1] > 1 else None
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "bias": float(bias),
+            "token_pattern": params["token_pattern"],
+            "n_features": int(len(vocabulary)),
+            "ngram_range": list(ngram_range),
+            "stop_words": stop_words,
+            "sublinear_tf": bool(params.get("sublinear_tf", False)),
+            "norm": params.get("norm"),
+        }, f, indent=2)
+    return atomic_replace_dir(tmp_path, path)
+
+
+def sync_compiled(model, vectorizer, path=COMPILED_PATH):
+    """
+    Re-export the compiled scorer for a newly saved model. Pairs that cannot be
+    compiled (e.g. a HashingVectorizer has no vocabulary) remove any existing
+    artifact instead, so load_system() never serves a stale one.
+    """
+    try:
+        export_compiled(model, vectorizer, path)
+        return True
+    except ValueError as e:
+        remove_path(path)
+        print(f"   (Compiled scorer not exported: {e})")
+        return False
+
+def export_from_pickles():
+    """Compile the currently saved models/*.pkl pair without retraining."""
+    import joblib
+
+    model = joblib.load(os.path.join(BASE_DIR, "models", "aff_model.pkl"))
+    vectorizer = joblib.load(os.path.join(BASE_DIR, "models", "vectorizer.pkl"))
+    path = export_compiled(model, vectorizer)
+    print(f"Exported compiled scorer to {path}")
+
+
+if __name__ == "__main__":
+    export_from_pickles()
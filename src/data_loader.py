@@ -1,32 +1,46 @@
 import pandas as pd
 import numpy as np
-import re
+import argparse
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from text_cleaning import clean_text
+from near_duplicates import CAMPAIGNS_PATH, CampaignIndex, find_near_duplicates
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DATA_PATH = os.path.join(BASE_DIR, "data", "raw")
 PROCESSED_DATA_PATH = os.path.join(BASE_DIR, "data", "processed")
+PROCESSED_FILE = os.path.join(PROCESSED_DATA_PATH, "clean_dataset.csv")
+PROCESSED_PARQUET_FILE = os.path.join(PROCESSED_DATA_PATH, "clean_dataset.parquet")
+
+# "csv" or "parquet". Readers fall back to whichever file exists when unset.
+DATA_FORMAT = os.environ.get("AFF_DATA_FORMAT")
 
 FRAUD_FILE = os.path.join(RAW_DATA_PATH, "fradulent_emails.txt")
 HAM_FILE = os.path.join(RAW_DATA_PATH, "spam_ham_dataset.csv")
 SMS_FILE = os.path.join(RAW_DATA_PATH, "sms_spam.csv")
 JOB_FILE = os.path.join(RAW_DATA_PATH, "fake_job_postings.csv")
 
-def clean_text(text):
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    text = re.sub(r'\b(from|to|subject|date|received):.*', '', text)
-    text = re.sub(r'[^a-zA-Z0-9\s$]', ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+def clean_text_series(texts):
+    """
+    Bulk clean_text for a pandas Series, keeping its index. A plain comprehension
+    beats both Series.apply and chained .str methods here, since each .str step
+    is its own Python-level pass over the column.
+    """
+    return pd.Series([clean_text(t) for t in texts], index=texts.index, dtype=object)
+
+FRAUD_SEPARATOR = "From r"
+AFF_SMS_KEYWORDS = ['won', 'prize', 'cash', 'claim', 'urgent', 'award', 'contact', 'call', 'money']
+DEFAULT_CHUNKSIZE = 50_000
 
 def parse_fraud_txt(filepath):
     print(f"   -> Loading Classic AFF (Nigeria/419)...")
     try:
         with open(filepath, 'r', encoding='latin-1') as f:
             data = f.read()
-        emails = data.split("From r")
+        emails = data.split(FRAUD_SEPARATOR)
         df = pd.DataFrame({'text': [e for e in emails if len(e) > 50]})
         df['label'] = 1
         return df
@@ -34,70 +48,376 @@ def parse_fraud_txt(filepath):
         print(f"      File not found: {filepath}")
         return pd.DataFrame()
 
+def _ham_columns(columns):
+    text_col = 'text' if 'text' in columns else 'v2'
+    label_col = 'label' if 'label' in columns else 'v1'
+    return text_col, label_col
+
+def _select_ham(df, text_col, label_col, keep_only_ham):
+    if keep_only_ham:
+        df = df[df[label_col] == 'ham']
+    df = df.rename(columns={text_col: 'text'})
+    df = df[['text']].copy()
+    df['label'] = 0
+    return df
+
 def parse_ham_csv(filepath):
     print(f"   -> Loading Legitimate Emails...")
     try:
         df = pd.read_csv(filepath)
-        text_col = 'text' if 'text' in df.columns else 'v2'
-        label_col = 'label' if 'label' in df.columns else 'v1'
-        if label_col in df.columns and 'ham' in df[label_col].values:
-            df = df[df[label_col] == 'ham']
-        df = df.rename(columns={text_col: 'text'})
-        df = df[['text']].copy()
-        df['label'] = 0
-        return df
+        text_col, label_col = _ham_columns(df.columns)
+        keep_only_ham = label_col in df.columns and 'ham' in df[label_col].values
+        return _select_ham(df, text_col, label_col, keep_only_ham)
     except FileNotFoundError:
         print(f"      File not found: {filepath}")
         return pd.DataFrame()
 
+def _select_sms_aff(df):
+    df = df.rename(columns={'v1': 'label', 'v2': 'text'})
+    spam_df = df[df['label'] == 'spam'].copy()
+    pattern = '|'.join(AFF_SMS_KEYWORDS)
+    aff_sms = spam_df[spam_df['text'].str.lower().str.contains(pattern)].copy()
+    aff_sms['label'] = 1
+    return len(spam_df), aff_sms[['text', 'label']]
+
 def parse_sms_csv(filepath):
     print(f"   -> Loading Modern SMS AFF (Lottery/Prize Scams)...")
     try:
         df = pd.read_csv(filepath, encoding='latin-1')
-        df = df.rename(columns={'v1': 'label', 'v2': 'text'})
-        spam_df = df[df['label'] == 'spam'].copy()
-        aff_keywords = ['won', 'prize', 'cash', 'claim', 'urgent', 'award', 'contact', 'call', 'money']
-        pattern = '|'.join(aff_keywords)
-        aff_sms = spam_df[spam_df['text'].str.lower().str.contains(pattern)]
-        print(f"      (Filtered {len(spam_df)} spam msgs down to {len(aff_sms)} STRICT AFF msgs)")
-        aff_sms['label'] = 1
-        return aff_sms[['text', 'label']]
+        n_spam, aff_sms = _select_sms_aff(df)
+        print(f"      (Filtered {n_spam} spam msgs down to {len(aff_sms)} STRICT AFF msgs)")
+        return aff_sms
     except FileNotFoundError:
         print(f"      File not found: {filepath}")
         return pd.DataFrame()
 
+def _select_job_aff(df):
+    df = df[df['fraudulent'] == 1].copy()
+    df['text'] = df['title'] + " " + df['description']
+    df['label'] = 1
+    return df[['text', 'label']]
+
 def parse_job_csv(filepath):
     print(f"   -> Loading Employment AFF Scams...")
     try:
         df = pd.read_csv(filepath)
-        df = df[df['fraudulent'] == 1]
-        df['text'] = df['title'] + " " + df['description']
-        df['label'] = 1
-        return df[['text', 'label']]
+        return _select_job_aff(df)
     except FileNotFoundError:
         print(f"      File not found: {filepath}")
         return pd.DataFrame()
 
-def load_and_process_data():
-    os.makedirs(PROCESSED_DATA_PATH, exist_ok=True)
-    print("--- STARTING STRICT AFF DATA INGESTION ---")
-    df_old_fraud = parse_fraud_txt(FRAUD_FILE)
-    df_ham = parse_ham_csv(HAM_FILE)
-    df_sms_aff = parse_sms_csv(SMS_FILE)
-    df_jobs_aff = parse_job_csv(JOB_FILE)
-    df = pd.concat([df_old_fraud, df_ham, df_sms_aff, df_jobs_aff], axis=0).reset_index(drop=True)
-    print(f"\nProcessing {len(df)} total raw samples...")
-    df['clean_text'] = df['text'].apply(clean_text)
-    df = df[df['clean_text'].str.len() > 10]
-    output_path = os.path.join(PROCESSED_DATA_PATH, "clean_dataset.csv")
-    df.to_csv(output_path, index=False)
+def iter_fraud_emails(filepath, block_size=1 << 20):
+    """
+    Yield the same pieces as f.read().split("From r"), but reading the file in
+    blocks so only the current (unfinished) email is ever held in memory.
+    Blocks of an unfinished email are collected in a list and joined once a
+    separator shows up, so a huge email costs linear, not quadratic, time.
+    """
+    overlap = len(FRAUD_SEPARATOR) - 1
+    with open(filepath, 'r', encoding='latin-1') as f:
+        pending, tail = [], ''
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            # Only a separator starting in the last few pending characters
+            # can straddle the block boundary.
+            if FRAUD_SEPARATOR not in tail + block:
+                pending.append(block)
+                tail = (tail + block)[-overlap:]
+                continue
+            parts = (''.join(pending) + block).split(FRAUD_SEPARATOR)
+            last = parts.pop()
+            pending, tail = [last], last[-overlap:]
+            yield from parts
+        yield ''.join(pending)
+
+def iter_fraud_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE):
+    print(f"   -> Streaming Classic AFF (Nigeria/419)...")
+    try:
+        batch = []
+        for email in iter_fraud_emails(filepath):
+            if len(email) > 50:
+                batch.append(email)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame({'text': batch, 'label': 1})
+                batch = []
+        if batch:
+            yield pd.DataFrame({'text': batch, 'label': 1})
+    except FileNotFoundError:
+        print(f"      File not found: {filepath}")
+
+def iter_ham_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE):
+    print(f"   -> Streaming Legitimate Emails...")
+    try:
+        columns = pd.read_csv(filepath, nrows=0).columns
+    except FileNotFoundError:
+        print(f"      File not found: {filepath}")
+        return
+    text_col, label_col = _ham_columns(columns)
+    # The in-memory path only filters to 'ham' when the label appears anywhere in
+    # the file, so decide that up front with a single-column pass.
+    keep_only_ham = False
+    if label_col in columns:
+        for labels in pd.read_csv(filepath, usecols=[label_col], chunksize=chunksize):
+            if 'ham' in labels[label_col].values:
+                keep_only_ham = True
+                break
+    for chunk in pd.read_csv(filepath, chunksize=chunksize, dtype={text_col: str}):
+        yield _select_ham(chunk, text_col, label_col, keep_only_ham)
+
+def iter_sms_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE):
+    print(f"   -> Streaming Modern SMS AFF (Lottery/Prize Scams)...")
+    try:
+        reader = pd.read_csv(filepath, encoding='latin-1', chunksize=chunksize, dtype={'v2': str})
+        n_spam = n_aff = 0
+        for chunk in reader:
+            chunk_spam, aff_sms = _select_sms_aff(chunk)
+            n_spam += chunk_spam
+            n_aff += len(aff_sms)
+            yield aff_sms
+        print(f"      (Filtered {n_spam} spam msgs down to {n_aff} STRICT AFF msgs)")
+    except FileNotFoundError:
+        print(f"      File not found: {filepath}")
+
+def iter_job_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE):
+    print(f"   -> Streaming Employment AFF Scams...")
+    try:
+        reader = pd.read_csv(filepath, chunksize=chunksize, dtype={'title': str, 'description': str})
+        for chunk in reader:
+            yield _select_job_aff(chunk)
+    except FileNotFoundError:
+        print(f"      File not found: {filepath}")
+
+def _clean_texts(texts):
+    return [clean_text(t) for t in texts]
+
+def _clean_frame(df, pool=None, workers=1):
+    if pool is None:
+        df['clean_text'] = clean_text_series(df['text'])
+    else:
+        # Split into a few units per worker; Executor.map hands results back in
+        # submission order, so reassembly is deterministic.
+        texts = df['text'].tolist()
+        unit = max(1000, -(-len(texts) // (workers * 4)))
+        units = [texts[i:i + unit] for i in range(0, len(texts), unit)]
+        cleaned = [c for part in pool.map(_clean_texts, units) for c in part]
+        df['clean_text'] = pd.Series(cleaned, index=df.index, dtype=object)
+    return df[df['clean_text'].str.len() > 10]
+
+def _print_summary(total, n_fraud, n_legit):
     print("\n" + "="*40)
     print(f"DATASET COMPILED (STRICTLY AFF)")
-    print(f"Total Samples: {len(df)}")
-    print(f"   - Fraud (1): {len(df[df['label']==1])}")
+    print(f"Total Samples: {total}")
+    print(f"   - Fraud (1): {n_fraud}")
     print(f"     (Includes: Classic 419, Fake Jobs, Lottery SMS)")
-    print(f"   - Legit (0): {len(df[df['label']==0])}")
+    print(f"   - Legit (0): {n_legit}")
     print("="*40)
 
+def _source_files(raw_dir=None):
+    files = (FRAUD_FILE, HAM_FILE, SMS_FILE, JOB_FILE)
+    if raw_dir is None:
+        return files
+    return tuple(os.path.join(raw_dir, os.path.basename(f)) for f in files)
+
+def processed_path(fmt=None):
+    """
+    Path of the processed dataset for `fmt` ("csv" or "parquet"). Without an
+    explicit format (argument or AFF_DATA_FORMAT) the most recently written of
+    the two is used, with CSV as the fallback when neither exists.
+    """
+    fmt = fmt or DATA_FORMAT
+    if fmt is None:
+        existing = [p for p in (PROCESSED_FILE, PROCESSED_PARQUET_FILE) if os.path.exists(p)]
+        return max(existing, key=os.path.getmtime) if existing else PROCESSED_FILE
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown data format {fmt!r}; expected 'csv' or 'parquet'.")
+    return PROCESSED_PARQUET_FILE if fmt == 'parquet' else PROCESSED_FILE
+
+def _is_parquet(path):
+    return path.endswith('.parquet')
+
+def read_processed(columns=None, path=None):
+    """
+    Load the processed dataset, reading only `columns` when given. Parquet files
+    are memory-mapped, so only the requested column chunks are paged in.
+    """
+    path = path or processed_path()
+    if _is_parquet(path):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    return pd.read_csv(path, usecols=columns)
+
+def iter_processed(columns=None, chunksize=DEFAULT_CHUNKSIZE, path=None):
+    """Yield the processed dataset as DataFrames of at most `chunksize` rows."""
+    path = path or processed_path()
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+def processed_columns(path=None):
+    """Column names of the processed dataset without loading any rows."""
+    path = path or processed_path()
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def _write_frame(df, output_path):
+    if _is_parquet(output_path):
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False)
+
+class _ChunkWriter:
+    """Appends cleaned chunks to a CSV, or to row groups of one Parquet file."""
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.started = False
+        self._parquet = None
+
+    def write(self, chunk):
+        if _is_parquet(self.output_path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = pa.schema([('text', pa.string()), ('label', pa.int64()),
+                                ('clean_text', pa.string())])
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.output_path, schema)
+            self._parquet.write_table(table)
+        else:
+            chunk.to_csv(self.output_path, mode='a' if self.started else 'w',
+                         header=not self.started, index=False)
+        self.started = True
+
+    def close(self):
+        if not self.started:
+            _write_frame(pd.DataFrame({'text': pd.Series(dtype=object),
+                                       'label': pd.Series(dtype='int64'),
+                                       'clean_text': pd.Series(dtype=object)}),
+                         self.output_path)
+        if self._parquet is not None:
+            self._parquet.close()
+
+def load_and_process_data(workers=1, raw_dir=None, output_path=PROCESSED_FILE):
+    """
+    With workers > 1 the four sources are parsed concurrently and cleaning is
+    sharded across a process pool; the output is identical to a serial run.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    print("--- STARTING STRICT AFF DATA INGESTION ---")
+    fraud_file, ham_file, sms_file, job_file = _source_files(raw_dir)
+    parsers = [(parse_fraud_txt, fraud_file), (parse_ham_csv, ham_file),
+               (parse_sms_csv, sms_file), (parse_job_csv, job_file)]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if pool is None:
+            frames = [parse(path) for parse, path in parsers]
+        else:
+            futures = [pool.submit(parse, path) for parse, path in parsers]
+            frames = [f.result() for f in futures]
+        df = pd.concat(frames, axis=0).reset_index(drop=True)
+        print(f"\nProcessing {len(df)} total raw samples...")
+        df = _clean_frame(df, pool, workers)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    _write_frame(df, output_path)
+    _print_summary(len(df), len(df[df['label']==1]), len(df[df['label']==0]))
+
+def stream_and_process_data(chunksize=DEFAULT_CHUNKSIZE, workers=1, raw_dir=None,
+                            output_path=PROCESSED_FILE):
+    """
+    Streaming variant of load_and_process_data: every source is read in chunks
+    of at most `chunksize` rows, cleaned and appended to the output CSV, so peak
+    memory is bounded by the chunk size rather than the corpus. The output file
+    has the same rows, in the same order, as the in-memory path. With workers > 1
+    each chunk is cleaned across a process pool.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    print("--- STARTING STRICT AFF DATA INGESTION (STREAMING) ---")
+    fraud_file, ham_file, sms_file, job_file = _source_files(raw_dir)
+    sources = [
+        iter_fraud_chunks(fraud_file, chunksize),
+        iter_ham_chunks(ham_file, chunksize),
+        iter_sms_chunks(sms_file, chunksize),
+        iter_job_chunks(job_file, chunksize),
+    ]
+    n_raw = n_fraud = n_legit = 0
+    writer = _ChunkWriter(output_path)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for source in sources:
+            for chunk in source:
+                n_raw += len(chunk)
+                chunk = _clean_frame(chunk, pool, workers)
+                writer.write(chunk)
+                n_fraud += int((chunk['label'] == 1).sum())
+                n_legit += int((chunk['label'] == 0).sum())
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown()
+    print(f"\nProcessed {n_raw} total raw samples in chunks of {chunksize}.")
+    _print_summary(n_fraud + n_legit, n_fraud, n_legit)
+
+def dedupe_processed_data(path=None, campaigns_path=CAMPAIGNS_PATH):
+    """
+    Drop near-duplicate rows (MinHash/LSH over clean_text, see
+    near_duplicates.py) from the processed dataset, keeping the first row of
+    each group, and export every group of MIN_CAMPAIGN_SIZE or more rows as a
+    known campaign for serving. Only label and clean_text are loaded for the
+    clustering; the file is then rewritten chunk by chunk.
+    """
+    path = path or processed_path()
+    df = read_processed(['label', 'clean_text'], path=path)
+    cleaned = df['clean_text'].fillna('').astype(str).tolist()
+    print(f"\nFinding near-duplicates among {len(cleaned)} rows...")
+    cluster_ids, signatures = find_near_duplicates(cleaned)
+    keep = cluster_ids == np.arange(len(cluster_ids))
+    index = CampaignIndex.from_clusters(cluster_ids, signatures, df['label'].to_numpy())
+    index.save(campaigns_path)
+    del df, cleaned, signatures
+
+    root, ext = os.path.splitext(path)
+    tmp_path = root + ".dedupe" + ext
+    writer = _ChunkWriter(tmp_path)
+    offset = 0
+    try:
+        for chunk in iter_processed(path=path):
+            writer.write(chunk[keep[offset:offset + len(chunk)]])
+            offset += len(chunk)
+    finally:
+        writer.close()
+    os.replace(tmp_path, path)
+    n_removed = int(len(keep) - keep.sum())
+    print(f"   Removed {n_removed} near-duplicates; {int(keep.sum())} rows remain.")
+    print(f"   Exported {len(index)} campaigns covering {int(index.sizes.sum())} messages to {campaigns_path}")
+    return n_removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile data/processed/clean_dataset.csv from data/raw/.")
+    parser.add_argument('--stream', action='store_true',
+                        help="read, clean and write in chunks to keep memory bounded")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk in --stream mode (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes for parsing and cleaning (default: %(default)s)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=DATA_FORMAT or 'csv',
+                        help="processed dataset format; parquet needs pyarrow (default: %(default)s)")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="drop near-duplicate rows and export the campaign index to models/campaigns/")
+    args = parser.parse_args()
+    output_path = processed_path(args.format)
+    if args.stream:
+        stream_and_process_data(args.chunksize, args.workers, output_path=output_path)
+    else:
+        load_and_process_data(args.workers, output_path=output_path)
+    if args.dedupe:
+        dedupe_processed_data(output_path)
+
 if __name__ == "__main__":
-    load_and_process_data()
\ No newline at end of file
+    main()
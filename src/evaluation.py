@@ -0,0 +1,140 @@
+import numpy as np
+
+# Binary evaluation helpers shared by train_model, analyze_results and
+# print_metrics. NumPy only: every metric is derived from one confusion
+# matrix, and every threshold from one sort of the scores.
+
+
+def _ratio(num, den):
+    """num / den elementwise, 0 where den is 0 (sklearn's zero_division=0)."""
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    out = np.zeros(np.broadcast(num, den).shape)
+    np.divide(num, den, out=out, where=den != 0)
+    return out if out.ndim else float(out)
+
+
+def confusion(y_true, y_pred):
+    """2x2 confusion matrix [[tn, fp], [fn, tp]] in a single bincount."""
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred, dtype=np.int64)
+    return np.bincount(2 * y_true + y_pred, minlength=4).reshape(2, 2)
+
+
+def metrics_from_confusion(cm):
+    """Accuracy, precision, recall, F1 and specificity of the fraud class, plus the raw counts."""
+    (tn, fp), (fn, tp) = np.asarray(cm).tolist()
+    return {
+        "accuracy": _ratio(tp + tn, tn + fp + fn + tp),
+        "precision": _ratio(tp, tp + fp),
+        "recall": _ratio(tp, tp + fn),
+        "f1": _ratio(2 * tp, 2 * tp + fp + fn),
+        "specificity": _ratio(tn, tn + fp),
+        "tp": tp, "tn": tn, "fp": fp, "fn": fn,
+    }
+
+
+def evaluate(y_true, y_pred):
+    """(confusion matrix, metrics) for one set of predictions."""
+    cm = confusion(y_true, y_pred)
+    return cm, metrics_from_confusion(cm)
+
+
+def threshold_sweep(y_true, scores, thresholds):
+    """
+    Confusion counts and metrics at every threshold in one pass, with the rule
+    "fraud iff score > threshold". The scores are sorted once; each threshold
+    is then a binary search into them, so the cost is O((n + k) log n) rather
+    than one pass over the labels per threshold. Returns a dict of arrays
+    aligned with `thresholds`.
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    order = np.argsort(scores, kind="mergesort")
+    sorted_scores = scores[order]
+    # positives_above[i] = number of positives among sorted_scores[i:]
+    positives_above = np.concatenate([np.cumsum(y_true[order][::-1])[::-1], [0]])
+    n = len(y_true)
+    n_pos = int(y_true.sum())
+    first_above = np.searchsorted(sorted_scores, thresholds, side="right")
+    tp = positives_above[first_above]
+    fp = (n - first_above) - tp
+    fn = n_pos - tp
+    tn = (n - n_pos) - fp
+    return {
+        "threshold": thresholds,
+        "tp": tp, "fp": fp, "tn": tn, "fn": fn,
+        "accuracy": _ratio(tp + tn, n),
+        "precision": _ratio(tp, tp + fp),
+        "recall": _ratio(tp, tp + fn),
+        "f1": _ratio(2 * tp, 2 * tp + fp + fn),
+        "fpr": _ratio(fp, fp + tn),
+    }
+
+
+def curves(y_true, scores):
+    """
+    ROC and precision/recall curves over every distinct score, from a single
+    threshold_sweep(). Points run from "nothing flagged" to "everything
+    flagged". Also returns ROC AUC (trapezoidal) and average precision
+    (step-wise, as in sklearn.metrics.average_precision_score).
+    """
+    distinct = np.unique(np.asarray(scores, dtype=np.float64))
+    thresholds = np.concatenate([distinct[::-1], [-np.inf]])
+    sweep = threshold_sweep(y_true, scores, thresholds)
+    tpr, fpr = sweep["recall"], sweep["fpr"]
+    # The first point flags nothing; its precision is undefined and is not
+    # part of the PR curve.
+    recall, precision = tpr[1:], sweep["precision"][1:]
+    return {
+        "thresholds": thresholds,
+        "fpr": fpr,
+        "tpr": tpr,
+        "precision": precision,
+        "recall": recall,
+        "roc_auc": float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)),
+        "average_precision": float(np.sum(np.diff(np.concatenate([[0.0], recall])) * precision)),
+    }
+
+
+def save_scores(path, labels, cv_fold, cv_proba, holdout_index, holdout_proba):
+    """
+    Per-row scores from training as one uncompressed .npz: labels and CV fold
+    IDs as int8, out-of-fold and holdout fraud probabilities as float64, and
+    the holdout's row positions as int32. Thresholds can then be evaluated
+    against them without re-scoring anything.
+    """
+    np.savez(
+        path,
+        label=np.asarray(labels, dtype=np.int8),
+        cv_fold=np.asarray(cv_fold, dtype=np.int8),
+        cv_fraud_probability=np.asarray(cv_proba, dtype=np.float64),
+        holdout_index=np.asarray(holdout_index, dtype=np.int32),
+        holdout_fraud_probability=np.asarray(holdout_proba, dtype=np.float64),
+    )
+
+
+def load_scores(path, source="cv"):
+    """
+    (labels, fraud probabilities, fold IDs) stored by save_scores(). `source`
+    is "cv" for the out-of-fold scores of every row, or "holdout" for the 20%
+    holdout (fold IDs are then None).
+    """
+    with np.load(path) as scores:
+        labels = scores["label"]
+        if source == "cv":
+            return labels, scores["cv_fraud_probability"], scores["cv_fold"]
+        if source == "holdout":
+            return labels[scores["holdout_index"]], scores["holdout_fraud_probability"], None
+    raise ValueError(f"Unknown score source {source!r}; expected 'cv' or 'holdout'.")
+
+
+def expected_costs(sweep, costs):
+    """
+    Total misclassification cost at every threshold of a sweep for each
+    (false_positive_cost, false_negative_cost) pair: one (k, 2) x (2, T)
+    product for all k cost matrices. Returns a (k, T) array.
+    """
+    costs = np.asarray(costs, dtype=np.float64).reshape(-1, 2)
+    return costs @ np.vstack([sweep["fp"], sweep["fn"]]).astype(np.float64)
@@ -0,0 +1,99 @@
+import numpy as np
+
+# Explanations for the binary Naive Bayes scorer. Its logit is
+#     bias + sum_j x_j * log_ratio_j,   log_ratio = flp[1] - flp[0]
+# where x_j is the feature value (a count, or a TF-IDF weight), so each
+# token's contribution to a prediction is its weight times its per-feature
+# log-likelihood ratio, and the global keyword ranking is simply the ranking
+# of log_ratio itself.
+
+
+def top_k(values, k):
+    """
+    Indices of the k largest values, largest first. np.argpartition selects
+    them in O(n) and only those k are sorted, instead of sorting everything.
+    """
+    values = np.asarray(values)
+    k = min(k, len(values))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(values):
+        candidates = np.argpartition(-values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(-values[candidates], kind="stable")]
+
+
+class Explainer:
+    """
+    Per-feature fraud-vs-legit log-likelihood ratios, computed once per loaded
+    model, plus the feature names to report them under.
+
+    Works with the compiled scorer (whose weights already are the ratio) and
+    with a fitted MultinomialNB + CountVectorizer/HashingVectorizer pair.
+    Hashed features have no names and are reported as "#<index>".
+    """
+
+    def __init__(self, log_ratio, feature_names=None, top_k=5):
+        self.log_ratio = np.asarray(log_ratio, dtype=np.float64)
+        self.feature_names = feature_names
+        self.top_k = top_k
+
+    @classmethod
+    def from_system(cls, model, vectorizer, top_k=5):
+        if hasattr(model, "log_ratio"):
+            log_ratio = model.log_ratio
+        else:
+            if list(model.classes_) != [0, 1]:
+                raise ValueError(f"Expected binary classes [0, 1], got {list(model.classes_)}.")
+            log_ratio = model.feature_log_prob_[1] - model.feature_log_prob_[0]
+        if hasattr(vectorizer, "vocabulary_"):
+            feature_names = vectorizer.get_feature_names_out()
+        else:
+            # The compiled scorer's sorted vocabulary array; None for hashing.
+            feature_names = getattr(vectorizer, "vocabulary", None)
+        return cls(log_ratio, feature_names, top_k)
+
+    def name(self, index):
+        if self.feature_names is None:
+            return f"#{index}"
+        return str(self.feature_names[index])
+
+    def top_features(self, k=20, fraud=True):
+        """
+        (names, log-likelihood ratios) of the k features that most strongly
+        indicate fraud, or legitimate mail with fraud=False.
+        """
+        ratio = self.log_ratio if fraud else -self.log_ratio
+        idx = top_k(ratio, k)
+        return [self.name(i) for i in idx], self.log_ratio[idx]
+
+    def explain(self, X, k=None):
+        """
+        Top contributing tokens of every row of an already-vectorized CSR
+        matrix (scipy or SparseCounts), ranked by |weight * log_ratio|. Only
+        the nonzero entries are looked at, so the cost follows the tokens in
+        the batch, not the vocabulary size. Returns one list per row of
+        {"token", "weight", "contribution"} dicts, where weight is the
+        feature value (a count, or a TF-IDF weight); a positive contribution
+        pushes towards fraud.
+        """
+        k = self.top_k if k is None else k
+        indptr = np.asarray(X.indptr)
+        n_rows = len(indptr) - 1
+        rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+        contributions = X.data * self.log_ratio[X.indices]
+        # One lexsort ranks every row's entries at once (rows stay in CSR
+        # order); the first k of each row are kept.
+        order = np.lexsort((-np.abs(contributions), rows))
+        keep = order[np.arange(len(order)) - indptr[rows] < k]
+        if self.feature_names is None:
+            tokens = [f"#{i}" for i in X.indices[keep].tolist()]
+        else:
+            tokens = np.asarray(self.feature_names)[X.indices[keep]].tolist()
+        explanations = [[] for _ in range(n_rows)]
+        for row, token, weight, contribution in zip(
+            rows[keep].tolist(), tokens, X.data[keep].astype(np.float64).tolist(), contributions[keep].tolist()
+        ):
+            explanations[row].append({"token": token, "weight": weight, "contribution": contribution})
+        return explanations
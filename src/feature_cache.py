@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+
+from artifacts import hash_file
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
+
+# Bump when the on-disk layout changes so old entries are simply never hit.
+CACHE_VERSION = 1
+
+
+def cache_key(data_path, vectorizer):
+    """
+    Hash of the dataset bytes, the vectorizer class and parameters, and the
+    scikit-learn version (tokenization can change between releases). Any change
+    to one of them yields a new key, which is what invalidates the cache.
+    """
+    h = hashlib.sha256()
+    h.update(hash_file(data_path).hexdigest().encode())
+    h.update(type(vectorizer).__name__.encode())
+    h.update(json.dumps(vectorizer.get_params(), sort_keys=True, default=str).encode())
+    h.update(f"sklearn={sklearn.__version__};v={CACHE_VERSION}".encode())
+    return h.hexdigest()[:16]
+
+
+def _paths(key, cache_dir):
+    return (os.path.join(cache_dir, f"features_{key}.npz"),
+            os.path.join(cache_dir, f"features_{key}_meta.npz"))
+
+
+def load_or_build_features(data_path, texts, labels, vectorizer, cache_dir=CACHE_DIR):
+    """
+    Return (X, vectorizer) for `texts`, where `vectorizer` is fitted either by
+    fit_transform or by restoring the cached vocabulary (and IDF weights for
+    TF-IDF; a HashingVectorizer has no fitted state). The CSR matrix, that
+    state and the labels are stored under data/cache/ keyed by cache_key(); a
+    cached entry whose labels do not line up with `labels` is rebuilt.
+    """
+    key = cache_key(data_path, vectorizer)
+    matrix_path, meta_path = _paths(key, cache_dir)
+    labels = np.asarray(labels)
+
+    if os.path.exists(matrix_path) and os.path.exists(meta_path):
+        with np.load(meta_path, allow_pickle=False) as meta:
+            cached_labels = meta["labels"]
+            vocabulary = meta["vocabulary"].tolist() if "vocabulary" in meta.files else None
+            idf = meta["idf"] if "idf" in meta.files else None
+        if np.array_equal(cached_labels, labels):
+            X = sp.load_npz(matrix_path).tocsr()
+            if vocabulary is not None:
+                vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+                vectorizer.fixed_vocabulary_ = False
+            if idf is not None:
+                vectorizer.idf_ = idf
+            print(f"   Loaded cached features {key} ({X.shape[0]} x {X.shape[1]}, nnz={X.nnz})")
+            return X, vectorizer
+        print(f"   Cached features {key} do not match the dataset labels; rebuilding.")
+
+    X = vectorizer.fit_transform(texts).tocsr()
+    os.makedirs(cache_dir, exist_ok=True)
+    sp.save_npz(matrix_path, X, compressed=False)
+    state = {}
+    if hasattr(vectorizer, "vocabulary_"):
+        state["vocabulary"] = np.array(vectorizer.get_feature_names_out().tolist(), dtype=str)
+    if hasattr(vectorizer, "idf_"):
+        state["idf"] = vectorizer.idf_
+    np.savez(meta_path, labels=labels, **state)
+    print(f"   Cached features as {key} in {cache_dir}")
+    return X, vectorizer
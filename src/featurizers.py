@@ -0,0 +1,66 @@
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfVectorizer
+
+# Named featurizer configurations for train_model.py. "unigram" is the
+# original CountVectorizer(stop_words='english', max_features=5000); every
+# other key a configuration may set is listed in OPTIONS. MultinomialNB needs
+# non-negative features, so the hashing variant keeps plain counts.
+FEATURIZERS = {
+    "unigram": {"kind": "count", "max_features": 5000},
+    "bigram": {"kind": "count", "ngram_range": (1, 2), "max_features": 20000, "min_df": 2},
+    "tfidf": {"kind": "tfidf", "max_features": 5000, "sublinear_tf": True},
+    "tfidf-bigram": {"kind": "tfidf", "ngram_range": (1, 2), "max_features": 20000, "min_df": 2,
+                     "sublinear_tf": True},
+    "hashing": {"kind": "hashing", "ngram_range": (1, 2), "n_features": 2 ** 18},
+}
+DEFAULT_FEATURIZER = "unigram"
+
+OPTIONS = ("kind", "ngram_range", "max_features", "min_df", "max_df", "sublinear_tf", "n_features", "dtype")
+DTYPES = {"int32": np.int32, "int64": np.int64, "float32": np.float32, "float64": np.float64}
+
+
+def featurizer_config(name=DEFAULT_FEATURIZER, **overrides):
+    """
+    The named configuration with `overrides` applied (None values are
+    ignored), e.g. featurizer_config("bigram", min_df=5, dtype="float32").
+    """
+    if name not in FEATURIZERS:
+        raise ValueError(f"Unknown featurizer {name!r}; choose from {', '.join(FEATURIZERS)}.")
+    config = {"name": name, **FEATURIZERS[name]}
+    for key, value in overrides.items():
+        if key not in OPTIONS:
+            raise ValueError(f"Unknown featurizer option {key!r}.")
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def make_vectorizer(config):
+    """
+    Unfitted vectorizer for a configuration from featurizer_config(). All of
+    them tokenize like the original CountVectorizer (English stop words, the
+    default token pattern), so their output is scored by the same
+    MultinomialNB and serving code. Integer dtypes are only meaningful for
+    raw counts; TF-IDF weights are always floating point.
+    """
+    kind = config.get("kind", "count")
+    common = {"stop_words": "english", "ngram_range": tuple(config.get("ngram_range", (1, 1)))}
+    dtype = DTYPES[config["dtype"]] if config.get("dtype") else None
+    if kind == "hashing":
+        return HashingVectorizer(n_features=config.get("n_features", 2 ** 18), alternate_sign=False, norm=None,
+                                 dtype=dtype or np.float64, **common)
+    common.update(max_features=config.get("max_features"), min_df=config.get("min_df", 1),
+                  max_df=config.get("max_df", 1.0))
+    if kind == "count":
+        return CountVectorizer(dtype=dtype or np.int64, **common)
+    if kind == "tfidf":
+        if dtype is not None and not np.issubdtype(dtype, np.floating):
+            raise ValueError("TF-IDF features need a float dtype (float32 or float64).")
+        return TfidfVectorizer(sublinear_tf=config.get("sublinear_tf", False), dtype=dtype or np.float64,
+                               **common)
+    raise ValueError(f"Unknown featurizer kind {kind!r}; expected count, tfidf or hashing.")
+
+
+def matrix_nbytes(X):
+    """Bytes held by a CSR matrix's data, indices and indptr arrays."""
+    return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
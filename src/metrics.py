@@ -0,0 +1,320 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+
+import numpy as np
+
+# Bucket upper bounds. Latencies are in seconds, from 50 µs (a cached hit)
+# to 5 s (a full /predict/batch of long texts).
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+INPUT_CHARS_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter, one value per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, one set of buckets per combination of label
+    values. observe() is a bisect and three additions under a lock, about
+    a microsecond, so it can stay on in the serving path. observe_many()
+    buckets a whole array with one searchsorted.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(float(b) for b in buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get(self, labels):
+        series = self._series.get(labels)
+        if series is None:
+            # Per-bucket (not cumulative) counts, the last one is +Inf; sum.
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._get(labels)
+            series[0][i] += 1
+            series[1] += value
+
+    def observe_many(self, values, *labels):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        counts = np.bincount(
+            np.searchsorted(self.buckets, values, side="left"), minlength=len(self.buckets) + 1
+        ).tolist()
+        total = float(values.sum())
+        with self._lock:
+            series = self._get(labels)
+            series[0] = [a + b for a, b in zip(series[0], counts)]
+            series[1] += total
+
+    def snapshot(self, *labels):
+        """(per-bucket counts, sum, count) of one series."""
+        with self._lock:
+            counts, total = self._get(labels)
+            return list(counts), total, sum(counts)
+
+    def render(self):
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        bounds = [*self.buckets, float("inf")]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = _labels(self.labelnames, labels, [("le", _number(bound))])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+def render_samples(name, documentation, kind, samples):
+    """
+    Prometheus text lines for a metric whose values are read at scrape time,
+    e.g. from a stats() dict. `samples` maps a tuple of (label, value) pairs
+    to the value; None values are skipped.
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples.items():
+        if value is not None:
+            lines.append(f"{name}{_labels((), (), labels)} {_number(value)}")
+    return lines
+
+
+class ServingMetrics:
+    """
+    Counters and histograms of the HTTP API, rendered in the Prometheus text
+    exposition format by render(). predict_messages() reports the time spent
+    in each scoring stage through observe_stage(); the API middleware reports
+    requests, and _score_with() batch sizes and input lengths.
+    """
+
+    def __init__(self):
+        self.requests = Counter(
+            "aff_requests_total", "HTTP requests by route and status code.", ("path", "status")
+        )
+        self.errors = Counter(
+            "aff_errors_total",
+            "Failed requests (status >= 400 or an unhandled exception) by route and status code.",
+            ("path", "status"),
+        )
+        self.stream_line_errors = Counter(
+            "aff_stream_line_errors_total", "Invalid NDJSON lines answered with an error line on /predict/stream."
+        )
+        self.request_seconds = Histogram(
+            "aff_request_duration_seconds", "Time from request start to the end of the response body.",
+            LATENCY_BUCKETS, ("path",),
+        )
+        self.stage_seconds = Histogram(
+            "aff_stage_duration_seconds",
+            "Time per pass in each stage: request parsing and validation, truncation, clean_text, "
+            "cache lookup, vectorize, predict_proba, explain and campaign match.",
+            LATENCY_BUCKETS, ("stage",),
+        )
+        self.batch_size = Histogram(
+            "aff_batch_size", "Texts per scoring pass (micro-batches, /predict/batch, stream chunks).",
+            BATCH_SIZE_BUCKETS,
+        )
+        self.input_chars = Histogram(
+            "aff_input_chars", "Length in characters of each scored text.", INPUT_CHARS_BUCKETS
+        )
+        self.truncated = Counter(
+            "aff_truncated_total", "Texts of which only the head and tail were scored."
+        )
+        self._metrics = [
+            self.requests, self.errors, self.stream_line_errors, self.truncated,
+            self.request_seconds, self.stage_seconds, self.batch_size, self.input_chars,
+        ]
+
+    def observe_stage(self, stage, seconds):
+        self.stage_seconds.observe(seconds, stage)
+
+    def observe_batch(self, texts):
+        self.batch_size.observe(len(texts))
+        if len(texts) == 1:
+            self.input_chars.observe(len(texts[0]))
+        else:
+            self.input_chars.observe_many([len(text) for text in texts])
+
+    def observe_request(self, path, status, seconds):
+        status = str(status)
+        self.requests.inc(path, status)
+        if int(status) >= 400:
+            self.errors.inc(path, status)
+        self.request_seconds.observe(seconds, path)
+
+    def render(self, gauges=()):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        lines.extend(gauges)
+        return "\n".join(lines) + "\n"
+
+
+# Leaf frames of threads that are only waiting (the event loop in select, idle
+# thread-pool workers on their queue); samples ending in them are dropped so
+# the profile shows where CPU time goes.
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("_thread.py", "_worker"),
+    ("thread.py", "_worker"),
+}
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for a running server. A daemon thread wakes
+    `hz` times a second, takes every other thread's Python stack from
+    sys._current_frames() and tallies it; nothing is traced between samples,
+    so it can be started and stopped on a live process. Time spent in NumPy,
+    SciPy or scikit-learn C code is charged to the Python frame that called it.
+    """
+
+    def __init__(self, hz=100, max_depth=64):
+        self.hz = hz
+        self.max_depth = max_depth
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stacks = _Tally()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, hz=None):
+        """Clear the previous profile and start sampling; a no-op when already running."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            if hz:
+                self.hz = hz
+            self._stacks = _Tally()
+            self.samples = 0
+            self.started_at, self.stopped_at = time.time(), None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="aff-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join()
+        self.stopped_at = time.time()
+        return True
+
+    def _run(self):
+        interval = 1.0 / self.hz
+        me = threading.get_ident()
+        while not self._stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """Stacks in the collapsed format of flamegraph.pl and speedscope: "root;...;leaf count" per line."""
+        stacks = dict(self._stacks)
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(stacks.items()))
+
+    def top(self, n=20):
+        """The n functions with the most samples on top of the stack, with their inclusive counts."""
+        stacks = dict(self._stacks)
+        own, inclusive = _Tally(), _Tally()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                inclusive[frame] += count
+        return [
+            {"function": frame, "self": count, "total": inclusive[frame]}
+            for frame, count in own.most_common(n)
+        ]
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "hz": self.hz,
+            "samples": self.samples,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import zlib
+
+import numpy as np
+
+from artifacts import atomic_replace_dir, remove_path
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMPAIGNS_PATH = os.path.join(BASE_DIR, "models", "campaigns")
+FORMAT_VERSION = 1
+
+# 128 MinHash values in 16 bands of 8: two texts become LSH candidates with
+# probability 1 - (1 - J^8)^16, i.e. ~0.1% at Jaccard 0.3, ~40% at 0.7 and
+# ~98% at 0.8 and above. Candidates are then confirmed on the full signature.
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 3
+THRESHOLD = 0.8
+# Only clusters with at least this many messages are exported as campaigns.
+MIN_CAMPAIGN_SIZE = 3
+SEED = 1
+
+# Shingles are hashed this many at a time; the (NUM_PERM, block) uint64
+# temporaries stay around 32 MB however large the corpus is.
+SHINGLE_BLOCK = 1 << 15
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_SHIFT32 = np.uint64(32)
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles of cleaned text, fully vectorized over
+    a batch. Each token is hashed once (crc32, stable across processes), each
+    shingle is a mix of its token hashes, and the NUM_PERM hash functions are
+    multiply-shift hashes ((a * x + b) mod 2^64) >> 32 of that 32-bit value.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE, seed=SEED):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands}).")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self._mix = rng.integers(1, 2**63, size=shingle_size, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._band_mix = rng.integers(1, 2**63, size=self.rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def _shingles(self, cleaned):
+        """(shingle hashes, per-text shingle counts) of a batch of cleaned texts."""
+        k = self.shingle_size
+        # Every text is followed by k - 1 zero hashes, so a text shorter than
+        # k tokens still has one window: a single shingle of all its tokens.
+        pad = [0] * (k - 1)
+        padded = []
+        window_starts = []
+        counts = []
+        for text in cleaned:
+            tokens = text.split()
+            start = len(padded)
+            padded.extend([zlib.crc32(t.encode()) for t in tokens])
+            padded.extend(pad)
+            n = max(len(tokens) - k + 1, 1) if tokens else 0
+            window_starts.extend(range(start, start + n))
+            counts.append(n)
+        padded = np.array(padded, dtype=np.uint64)
+        windows = np.array(window_starts, dtype=np.int64)
+        shingles = padded[windows] * self._mix[0]
+        for j in range(1, k):
+            shingles += padded[windows + j] * self._mix[j]
+        return (shingles >> _SHIFT32) ^ (shingles & _MASK32), np.array(counts, dtype=np.int64)
+
+    def signatures(self, cleaned):
+        """(n, num_perm) uint32 MinHash signatures. Texts without tokens get all-0xFFFFFFFF rows."""
+        shingles, counts = self._shingles(cleaned)
+        sig = np.full((len(counts), self.num_perm), 0xFFFFFFFF, dtype=np.uint32)
+        has = np.flatnonzero(counts)
+        if not len(has):
+            return sig
+        bounds = np.concatenate([[0], np.cumsum(counts[has])])
+        first = 0
+        while first < len(has):
+            # A block of whole texts with at most SHINGLE_BLOCK shingles (at least one text).
+            last = max(int(np.searchsorted(bounds, bounds[first] + SHINGLE_BLOCK, side="right")) - 1, first + 1)
+            block = shingles[bounds[first]:bounds[last]]
+            hashed = (self._a[:, None] * block[None, :] + self._b[:, None]) >> _SHIFT32
+            sig[has[first:last]] = np.minimum.reduceat(hashed, bounds[first:last] - bounds[first], axis=1).T
+            first = last
+        return sig
+
+    def band_keys(self, sig):
+        """(n, bands) uint32 LSH keys: one hash per band of `rows` signature values."""
+        banded = sig.reshape(len(sig), self.bands, self.rows).astype(np.uint64)
+        keys = (banded * self._band_mix).sum(axis=2)
+        return ((keys >> _SHIFT32) ^ (keys & _MASK32)).astype(np.uint32)
+
+
+def cluster_near_duplicates(sig, keys, threshold=THRESHOLD, block=1 << 16):
+    """
+    Cluster ID of every row: the index of the earliest row of its group of
+    near-duplicates. Rows sharing an LSH band key are candidates; within each
+    band the rows are sorted by key once, and every row is paired only with
+    the first row of its bucket, so there are at most bands * n candidate
+    pairs instead of n^2. Pairs whose signatures agree on at least
+    `threshold` of their values are linked, and clusters are the connected
+    components of those links.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    n, num_perm = sig.shape
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    empty = (sig == 0xFFFFFFFF).all(axis=1)
+    rows, firsts = [], []
+    for b in range(keys.shape[1]):
+        order = np.argsort(keys[:, b], kind="stable")
+        order = order[~empty[order]]
+        sorted_keys = keys[order, b]
+        starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        first = order[np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))]
+        rows.append(order[~starts])
+        firsts.append(first[~starts])
+    rows = np.concatenate(rows)
+    firsts = np.concatenate(firsts)
+    # The same pair is usually found by several bands; verify it once.
+    pairs = np.unique(np.stack([rows, firsts], axis=1), axis=0) if len(rows) else np.zeros((0, 2), np.int64)
+    min_agree = threshold * num_perm
+    linked = np.zeros(len(pairs), dtype=bool)
+    for i in range(0, len(pairs), block):
+        a, c = pairs[i:i + block, 0], pairs[i:i + block, 1]
+        linked[i:i + block] = np.count_nonzero(sig[a] == sig[c], axis=1) >= min_agree
+    pairs = pairs[linked]
+    graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, component = connected_components(graph, directed=False)
+    # Name each component after its earliest row.
+    earliest = np.full(component.max() + 1, n, dtype=np.int64)
+    np.minimum.at(earliest, component, np.arange(n))
+    return earliest[component]
+
+
+def find_near_duplicates(cleaned, hasher=None, threshold=THRESHOLD):
+    """(cluster ID per text, signatures) for a corpus of cleaned texts; see cluster_near_duplicates()."""
+    hasher = hasher or MinHasher()
+    sig = hasher.signatures(cleaned)
+    return cluster_near_duplicates(sig, hasher.band_keys(sig), threshold), sig
+
+
+def campaign_ids(signatures):
+    """
+    String ID per campaign, a hash of its representative's signature, so a
+    campaign keeps its ID across retrains as long as its first message does.
+    """
+    return np.array(["c-" + hashlib.blake2b(row.tobytes(), digest_size=6).hexdigest() for row in signatures],
+                    dtype="U14")
+
+
+class CampaignIndex:
+    """
+    Serve-time lookup of known campaigns. Stores the representative signature
+    of every campaign and one sorted uint64 array of (band << 32 | band key),
+    so a query is one np.searchsorted over all of its bands plus a signature
+    comparison against the few candidates; nothing has to be built on load and
+    the arrays can be memory-mapped like the compiled scorer.
+    """
+
+    def __init__(self, signatures, keys, key_campaigns, ids, sizes, fraud, hasher, threshold=THRESHOLD):
+        self.signatures = signatures
+        self.keys = keys
+        self.key_campaigns = key_campaigns
+        self.ids = ids
+        self.sizes = sizes
+        self.fraud = fraud
+        self.hasher = hasher
+        self.threshold = threshold
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_clusters(cls, cluster_ids, sig, labels, hasher=None, threshold=THRESHOLD,
+                      min_size=MIN_CAMPAIGN_SIZE):
+        """
+        Campaigns = clusters of at least min_size messages, each with its
+        earliest message's signature, its size and how many of its messages
+        are labelled fraud.
+        """
+        hasher = hasher or MinHasher()
+        sizes = np.bincount(cluster_ids, minlength=len(cluster_ids))
+        fraud = np.bincount(cluster_ids, weights=np.asarray(labels) == 1, minlength=len(cluster_ids))
+        kept = np.flatnonzero(sizes >= min_size)
+        signatures = np.ascontiguousarray(sig[kept])
+        band_keys = hasher.band_keys(signatures).astype(np.uint64)
+        combined = (np.arange(hasher.bands, dtype=np.uint64) << _SHIFT32) | band_keys
+        order = np.argsort(combined.ravel(), kind="stable")
+        return cls(
+            signatures=signatures,
+            keys=combined.ravel()[order],
+            key_campaigns=np.repeat(np.arange(len(kept), dtype=np.int32), hasher.bands)[order],
+            ids=campaign_ids(signatures),
+            sizes=sizes[kept].astype(np.int64),
+            fraud=fraud[kept].astype(np.int64),
+            hasher=hasher,
+            threshold=threshold,
+        )
+
+    def match(self, cleaned):
+        """
+        Best matching campaign of each cleaned text as {"id", "similarity",
+        "size", "fraud_share"}, or None when no known campaign reaches the
+        threshold.
+        """
+        sig = self.hasher.signatures(cleaned)
+        if not len(self.ids):
+            return [None] * len(sig)
+        bands = np.arange(self.hasher.bands, dtype=np.uint64) << _SHIFT32
+        queries = bands | self.hasher.band_keys(sig).astype(np.uint64)
+        # Several campaigns can share a band key; every entry of the equal
+        # range [lo, hi) of a query key is a candidate.
+        lo = np.searchsorted(self.keys, queries, side="left")
+        hi = np.searchsorted(self.keys, queries, side="right")
+        matches = []
+        for i in range(len(sig)):
+            counts = hi[i] - lo[i]
+            # Positions lo..hi-1 of every band, concatenated.
+            pos = np.repeat(lo[i] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            candidates = np.unique(self.key_campaigns[pos])
+            if not len(candidates) or (sig[i] == 0xFFFFFFFF).all():
+                matches.append(None)
+                continue
+            similarity = (self.signatures[candidates] == sig[i]).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] < self.threshold:
+                matches.append(None)
+                continue
+            c = int(candidates[best])
+            matches.append({
+                "id": str(self.ids[c]),
+                "similarity": float(similarity[best]),
+                "size": int(self.sizes[c]),
+                "fraud_share": float(self.fraud[c] / self.sizes[c]),
+            })
+        return matches
+
+    def save(self, path=CAMPAIGNS_PATH):
+        """Write the index as .npy arrays plus meta.json, swapped into place like the compiled scorer."""
+        tmp_path = path + ".tmp"
+        remove_path(tmp_path)
+        os.makedirs(tmp_path)
+        for name in ("signatures", "keys", "key_campaigns", "ids", "sizes", "fraud"):
+            np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({
+                "format": FORMAT_VERSION,
+                "num_perm": self.hasher.num_perm,
+                "bands": self.hasher.bands,
+                "shingle_size": self.hasher.shingle_size,
+                "seed": self.hasher.seed,
+                "threshold": self.threshold,
+                "campaigns": len(self.ids),
+            }, f, indent=2)
+        return atomic_replace_dir(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CAMPAIGNS_PATH, mmap=True):
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported campaign index format {meta.get('format')!r} in {path}.")
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+            for name in ("signatures", "keys", "key_campaigns", "ids", "sizes", "fraud")
+        }
+        hasher = MinHasher(meta["num_perm"], meta["bands"], meta["shingle_size"], meta["seed"])
+        return cls(hasher=hasher, threshold=meta["threshold"], **arrays)
+
+
+if __name__ == "__main__":
+    # Dedupe the existing processed dataset without re-ingesting data/raw/.
+    from data_loader import dedupe_processed_data
+
+    dedupe_processed_data()
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from importlib import metadata
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from artifacts import hash_file, remove_path
+from featurizers import DEFAULT_FEATURIZER, featurizer_config
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+RAW_DIR = os.path.join(BASE_DIR, "data", "raw")
+PROCESSED_DIR = os.path.join(BASE_DIR, "data", "processed")
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+PIPELINE_DIR = os.path.join(RESULTS_DIR, "pipeline")
+STATE_PATH = os.path.join(BASE_DIR, "data", "cache", "pipeline_state.json")
+RUNS_PATH = os.path.join(PIPELINE_DIR, "runs.jsonl")
+
+RAW_FILES = ("fradulent_emails.txt", "spam_ham_dataset.csv", "sms_spam.csv", "fake_job_postings.csv")
+PACKAGES = ("numpy", "pandas", "scikit-learn", "scipy", "pyarrow")
+IMPORT_RE = re.compile(r"^\s*(?:from\s+\.?(\w+)\s+import|import\s+(\w+))", re.MULTILINE)
+DONE = ("ran", "skipped")
+
+
+class Stage:
+    """
+    One step of the pipeline: a script in src/ run in its own interpreter.
+    `params` are the settings that change its outputs and go into its key;
+    `run_args` (worker counts and the like) are passed on but not hashed.
+    The console output goes to results/pipeline/<name>.log, which is also
+    the stage's only output when `outputs` is empty. `stale` paths are
+    outputs of the same stage under other params, removed before it runs.
+    """
+
+    def __init__(self, name, script, deps=(), inputs=(), outputs=(), params=None, args=(), run_args=(),
+                 stale=()):
+        self.name = name
+        self.script = os.path.join(SRC_DIR, script)
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.log_path = os.path.join(PIPELINE_DIR, f"{name}.log")
+        self.outputs = tuple(outputs) or (self.log_path,)
+        self.params = params or {}
+        self.args = tuple(args)
+        self.run_args = tuple(run_args)
+        self.stale = tuple(stale)
+
+
+def build_stages(data_format="csv", dedupe=False, workers=1, featurizer=None, n_jobs=1, plots=True):
+    """
+    The DAG, in a topological order:
+
+        ingest -> verify
+               -> train -> analyze
+                        -> metrics
+
+    verify runs alongside train, and analyze alongside metrics.
+    """
+    processed = os.path.join(PROCESSED_DIR, f"clean_dataset.{data_format}")
+    test_preds = os.path.join(PROCESSED_DIR, "test_predictions.csv")
+    campaigns = os.path.join(MODEL_DIR, "campaigns")
+    model = os.path.join(MODEL_DIR, "aff_model.pkl")
+    vectorizer = os.path.join(MODEL_DIR, "vectorizer.pkl")
+    featurizer = featurizer or featurizer_config(DEFAULT_FEATURIZER)
+
+    ingest_args = ["--format", data_format] + (["--dedupe"] if dedupe else [])
+    train_args = ["--featurizer", featurizer["name"]]
+    for option in ("min_df", "max_df", "max_features", "dtype"):
+        if featurizer.get(option) is not None:
+            train_args += [f"--{option.replace('_', '-')}", str(featurizer[option])]
+    plots_pngs = ("confusion_matrix.png", "roc_pr_curves.png", "top_fraud_words.png") if plots else ()
+
+    return [
+        Stage("ingest", "data_loader.py",
+              inputs=[os.path.join(RAW_DIR, name) for name in RAW_FILES],
+              outputs=[processed] + ([campaigns] if dedupe else []),
+              params={"format": data_format, "dedupe": dedupe},
+              args=ingest_args, run_args=["--workers", str(workers)],
+              # Without --dedupe, a campaign index from an earlier run would
+              # keep flagging campaigns found in data that is no longer used.
+              stale=[] if dedupe else [campaigns]),
+        Stage("verify", "verify_data.py", deps=["ingest"], inputs=[processed]),
+        Stage("train", "train_model.py", deps=["ingest"], inputs=[processed],
+              outputs=[model, vectorizer, os.path.join(MODEL_DIR, "aff_scorer"), test_preds,
+                       os.path.join(PROCESSED_DIR, "scores.npz")],
+              params={"featurizer": featurizer}, args=train_args, run_args=["--n-jobs", str(n_jobs)]),
+        Stage("analyze", "analyze_results.py", deps=["train"], inputs=[test_preds, model, vectorizer],
+              outputs=[os.path.join(PIPELINE_DIR, "analyze.log")]
+                      + [os.path.join(RESULTS_DIR, name) for name in plots_pngs],
+              params={"plots": plots}, args=[] if plots else ["--no-plots"]),
+        Stage("metrics", "print_metrics.py", deps=["train"],
+              inputs=[processed, test_preds, model, vectorizer]),
+    ]
+
+
+def _rel(path):
+    return os.path.relpath(path, BASE_DIR)
+
+
+class FileHashes:
+    """
+    sha256 of files and directories. Digests are remembered by path, size and
+    mtime, so an unchanged multi-gigabyte input is read once, not on every
+    run; a directory hashes the names and digests of the files under it.
+    Missing paths hash to None.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = memo if memo is not None else {}
+
+    def file(self, path):
+        st = os.stat(path)
+        rel = _rel(path)
+        cached = self.memo.get(rel)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = hash_file(path).hexdigest()
+        self.memo[rel] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def path(self, path):
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(f"{os.path.relpath(full, path)}\0{self.file(full)}\0".encode())
+        return digest.hexdigest()
+
+
+def code_files(script):
+    """The script and every module of src/ it imports, directly or not."""
+    seen, queue = set(), [script]
+    while queue:
+        path = queue.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path) as f:
+            source = f.read()
+        for match in IMPORT_RE.finditer(source):
+            module = os.path.join(SRC_DIR, (match.group(1) or match.group(2)) + ".py")
+            if os.path.exists(module):
+                queue.append(module)
+    return sorted(seen)
+
+
+def _environment():
+    versions = {"python": sys.version.split()[0]}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def stage_key(stage, hashes, environment):
+    """Hash of everything that determines a stage's outputs: code, inputs, parameters and package versions."""
+    payload = {
+        "stage": stage.name,
+        "params": stage.params,
+        "args": stage.args,
+        "environment": environment,
+        "code": {_rel(path): hashes.file(path) for path in code_files(stage.script)},
+        "inputs": {_rel(path): hashes.path(path) for path in stage.inputs},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def output_hashes(stage, hashes):
+    return {_rel(path): hashes.path(path) for path in stage.outputs}
+
+
+def _load_state():
+    if not os.path.exists(STATE_PATH):
+        return {"files": {}, "stages": {}}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _run_stage(stage, env):
+    """Run one stage's script with its output going to its log; returns (exit code, seconds)."""
+    start = time.perf_counter()
+    for path in stage.stale:
+        remove_path(path)
+    with open(stage.log_path, "w") as log:
+        result = subprocess.run([sys.executable, stage.script, *stage.args, *stage.run_args],
+                                cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode, time.perf_counter() - start
+
+
+def _select(stages, targets):
+    """The target stages and everything upstream of them, in DAG order."""
+    if not targets:
+        return stages
+    by_name = {stage.name: stage for stage in stages}
+    unknown = [name for name in targets if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stage {unknown[0]!r}; choose from {', '.join(by_name)}.")
+    wanted, queue = set(), list(targets)
+    while queue:
+        name = queue.pop()
+        if name not in wanted:
+            wanted.add(name)
+            queue.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in wanted]
+
+
+def _print_tail(path, lines=20):
+    with open(path) as f:
+        tail = f.readlines()[-lines:]
+    for line in tail:
+        print(f"      {line.rstrip()}")
+
+
+def _print_report(stages, results, wall):
+    print(f"\n{'stage':10} {'status':9} {'seconds':>9}")
+    for stage in stages:
+        r = results[stage.name]
+        seconds = f"{r['seconds']:9.2f}" if r["seconds"] is not None else f"{'':9}"
+        print(f"{stage.name:10} {r['status']:9} {seconds}")
+    busy = sum(r["seconds"] or 0.0 for r in results.values())
+    print(f"Wall clock {wall:.2f} s, {busy:.2f} s of stage time.")
+
+
+def run_pipeline(targets=None, force=False, dry_run=False, jobs=3, data_format="csv", dedupe=False, workers=1,
+                 featurizer=None, n_jobs=1, plots=True):
+    """
+    Run the stages leading to `targets` (default: all of them), skipping
+    each one whose key (stage_key) matches the last successful run and
+    whose outputs still hash to what that run wrote. A stage that reruns
+    but writes identical outputs leaves its dependents' keys unchanged, so
+    they are skipped too. Up to `jobs` independent stages run at once.
+    Every run is appended, with per-stage status and seconds, to
+    results/pipeline/runs.jsonl. Returns that record.
+    """
+    if jobs < 1:
+        raise ValueError(f"jobs must be at least 1, got {jobs}.")
+    stages = _select(build_stages(data_format, dedupe, workers, featurizer, n_jobs, plots), targets)
+    state = _load_state()
+    hashes = FileHashes(state["files"])
+    environment = _environment()
+    env = {**os.environ, "AFF_DATA_FORMAT": data_format}
+    os.makedirs(PIPELINE_DIR, exist_ok=True)
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    wall_start = time.perf_counter()
+    results = {}
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for stage in list(pending):
+                dep_status = [results.get(dep, {}).get("status") for dep in stage.deps]
+                if any(status in ("failed", "blocked") for status in dep_status):
+                    results[stage.name] = {"status": "blocked", "seconds": None, "key": None}
+                    pending.remove(stage)
+                    continue
+                if dry_run and "would run" in dep_status:
+                    # Upstream outputs do not exist yet, so there is nothing to hash.
+                    results[stage.name] = {"status": "would run", "seconds": None, "key": None}
+                    pending.remove(stage)
+                    continue
+                if not all(status in DONE + ("up to date",) for status in dep_status):
+                    continue
+                if len(running) >= jobs and not dry_run:
+                    break
+
+                check_start = time.perf_counter()
+                key = stage_key(stage, hashes, environment)
+                previous = state["stages"].get(stage.name, {})
+                fresh = (not force and previous.get("key") == key
+                         and previous.get("outputs") == output_hashes(stage, hashes))
+                check_seconds = time.perf_counter() - check_start
+                pending.remove(stage)
+                if dry_run:
+                    results[stage.name] = {"status": "up to date" if fresh else "would run",
+                                           "seconds": None, "key": key[:12]}
+                elif fresh:
+                    print(f"[pipeline] {stage.name}: up to date, skipped")
+                    results[stage.name] = {"status": "skipped", "seconds": check_seconds, "key": key[:12]}
+                else:
+                    print(f"[pipeline] {stage.name}: running ({_rel(stage.log_path)})")
+                    running[pool.submit(_run_stage, stage, env)] = (stage, key, check_seconds)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, key, check_seconds = running.pop(future)
+                code, seconds = future.result()
+                if code != 0:
+                    print(f"[pipeline] {stage.name}: failed with exit code {code} after {seconds:.2f} s")
+                    _print_tail(stage.log_path)
+                    state["stages"].pop(stage.name, None)
+                    results[stage.name] = {"status": "failed", "seconds": seconds, "key": key[:12]}
+                else:
+                    print(f"[pipeline] {stage.name}: done in {seconds:.2f} s")
+                    state["stages"][stage.name] = {
+                        "key": key,
+                        "outputs": output_hashes(stage, hashes),
+                        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                        "seconds": seconds,
+                    }
+                    results[stage.name] = {"status": "ran", "seconds": check_seconds + seconds, "key": key[:12]}
+                _save_state(state)
+
+    wall = time.perf_counter() - wall_start
+    record = {
+        "started_at": started_at,
+        "seconds": wall,
+        "ok": all(r["status"] in DONE + ("up to date", "would run") for r in results.values()),
+        "params": {stage.name: stage.params for stage in stages if stage.params},
+        "stages": {stage.name: results[stage.name] for stage in stages},
+    }
+    if dry_run:
+        for stage in stages:
+            print(f"{stage.name:10} {results[stage.name]['status']}")
+        return record
+    _save_state(state)
+    with open(RUNS_PATH, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    _print_report(stages, results, wall)
+    return record
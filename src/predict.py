@@ -1,20 +1,47 @@
-import joblib
+import argparse
+import hashlib
+import json
+import numpy as np
 import os
 import sys
+import time
+from typing import NamedTuple
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from data_loader import clean_text
+from artifacts import hash_file
+from text_cleaning import clean_text
+from compiled_model import COMPILED_PATH, CompiledNB
+from explain import Explainer
+from near_duplicates import CAMPAIGNS_PATH, CampaignIndex
+from prediction_cache import PredictionCache
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_PATH = os.path.join(BASE_DIR, "models", "aff_model.pkl")
 VEC_PATH = os.path.join(BASE_DIR, "models", "vectorizer.pkl")
+SERVING_CONFIG_PATH = os.path.join(BASE_DIR, "models", "serving_config.json")
+
+# Top contributing tokens returned with each served prediction (0 disables).
+EXPLAIN_TOP_K = int(os.environ.get("AFF_EXPLAIN_TOP_K", "5"))
+# Match served messages against models/campaigns/ when it exists (0 disables).
+CAMPAIGN_MATCH = os.environ.get("AFF_CAMPAIGN_MATCH", "1") != "0"
 
 def load_system():
     """
     Load model and vectorizer from disk. Returns (None, None) if files are missing
     (e.g. on first deploy without committed model files).
+
+    If train_model.py exported the compiled artifact (models/aff_scorer/) it is
+    memory-mapped and used for both roles, so serving imports neither
+    scikit-learn, scipy, pandas nor joblib. Set AFF_SERVING_BACKEND=sklearn to
+    force the pickled pair instead.
     """
     print("Loading AI Brain...")
+    if os.environ.get("AFF_SERVING_BACKEND", "compiled") != "sklearn" and os.path.exists(COMPILED_PATH):
+        scorer = CompiledNB.load(COMPILED_PATH)
+        print("Compiled scorer loaded.")
+        return scorer, scorer
+    import joblib
+
     try:
         model = joblib.load(MODEL_PATH)
         vectorizer = joblib.load(VEC_PATH)
@@ -25,17 +52,233 @@ def load_system():
         print("Run train_model.py locally, then commit models/*.pkl for deployment.")
         return None, None
 
-def predict_message(model, vectorizer, text):
-    cleaned = clean_text(text)
-    vec_text = vectorizer.transform([cleaned])
-    prediction = model.predict(vec_text)[0]
-    proba = model.predict_proba(vec_text)[0]
-    label = "SCAM / FRAUD" if prediction == 1 else "LEGITIMATE"
-    confidence = proba[prediction]
-    return label, confidence
+def load_threshold(path=SERVING_CONFIG_PATH):
+    """
+    Decision threshold from the serving config written by tune_threshold.py:
+    a message is fraud iff its fraud probability is > threshold. Returns None
+    (plain argmax, i.e. a threshold of 0.5) when no config exists, or when
+    the config was tuned for a model other than the one in models/.
+    """
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return None
+    threshold = config.get("threshold")
+    if threshold is None:
+        return None
+    if not 0.0 <= threshold < 1.0:
+        raise ValueError(f"Threshold in {path} must be in [0, 1), got {threshold}.")
+    tuned_for = config.get("model_version")
+    if tuned_for is not None:
+        try:
+            current = artifact_version(model_paths())
+        except FileNotFoundError:
+            current = tuned_for
+        if current != tuned_for:
+            print(f"Warning: threshold {threshold:g} in {os.path.basename(path)} was tuned for model {tuned_for}, "
+                  f"but models/ holds {current}; using argmax until tune_threshold.py is rerun.")
+            return None
+    return float(threshold)
+
+def write_threshold(threshold, path=SERVING_CONFIG_PATH, **details):
+    """Atomically write the serving config; `details` records how the threshold was chosen."""
+    if not 0.0 <= threshold < 1.0:
+        raise ValueError(f"Threshold must be in [0, 1), got {threshold}.")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"threshold": float(threshold), **details}, f, indent=2)
+    os.replace(tmp, path)
+
+class ServingSystem(NamedTuple):
+    """A loaded model/vectorizer pair with the version, threshold, explainer and campaign index it was loaded with."""
+    model: object
+    vectorizer: object
+    version: str
+    loaded_at: float
+    threshold: float | None = None
+    explainer: Explainer | None = None
+    campaigns: CampaignIndex | None = None
+
+def artifact_paths():
+    """
+    The files load_system() will read, in the backend it will pick, plus the
+    serving config and the campaign index when they exist.
+    """
+    if os.environ.get("AFF_SERVING_BACKEND", "compiled") != "sklearn" and os.path.exists(COMPILED_PATH):
+        paths = [COMPILED_PATH]
+    else:
+        paths = [MODEL_PATH, VEC_PATH]
+    if os.path.exists(SERVING_CONFIG_PATH):
+        paths.append(SERVING_CONFIG_PATH)
+    if CAMPAIGN_MATCH and os.path.exists(CAMPAIGNS_PATH):
+        paths.append(CAMPAIGNS_PATH)
+    return paths
+
+def model_paths():
+    """artifact_paths() without the serving config and campaign index: the files a threshold is tuned for."""
+    return [p for p in artifact_paths() if p not in (SERVING_CONFIG_PATH, CAMPAIGNS_PATH)]
+
+def _artifact_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                yield os.path.join(path, name)
+        else:
+            yield path
+
+def artifact_version(paths=None):
+    """Short content hash of the model artifacts; changes whenever they are retrained."""
+    h = hashlib.sha256()
+    for path in _artifact_files(paths or artifact_paths()):
+        hash_file(path, h)
+    return h.hexdigest()[:12]
+
+def validate_system(model, vectorizer):
+    """
+    Raise ValueError unless model and vectorizer belong together: the feature
+    counts must agree and a probe text must score to finite probabilities.
+    """
+    if hasattr(model, 'feature_log_prob_'):
+        n_model = model.feature_log_prob_.shape[1]
+    else:
+        n_model = len(model.log_ratio)
+    if hasattr(vectorizer, 'vocabulary_'):
+        n_vectorizer = len(vectorizer.vocabulary_)
+    else:
+        n_vectorizer = vectorizer.n_features
+    if n_model != n_vectorizer:
+        raise ValueError(f"Model expects {n_model} features but the vectorizer produces {n_vectorizer}.")
+    proba = model.predict_proba(vectorizer.transform(["urgent transfer of funds to your account"]))
+    if proba.shape != (1, 2) or not np.all(np.isfinite(proba)):
+        raise ValueError("Model produced invalid probabilities for the validation probe.")
+
+def load_serving_system():
+    """
+    load_system() plus versioning and validation, for long-running servers.
+    The artifacts are hashed before and after loading; if training rewrote them
+    in between, loading is retried so the version always matches what was
+    loaded. Returns None when the model files are missing.
+    """
+    for _ in range(3):
+        paths = artifact_paths()
+        try:
+            version = artifact_version(paths)
+        except FileNotFoundError:
+            version = None
+        model, vectorizer = load_system()
+        if model is None:
+            return None
+        threshold = load_threshold()
+        campaigns = CampaignIndex.load(CAMPAIGNS_PATH) if CAMPAIGNS_PATH in paths else None
+        if version is not None and artifact_version(paths) == version:
+            break
+        time.sleep(0.5)
+    else:
+        raise RuntimeError("Model files kept changing while loading; retry once training has finished.")
+    validate_system(model, vectorizer)
+    explainer = Explainer.from_system(model, vectorizer, EXPLAIN_TOP_K) if EXPLAIN_TOP_K > 0 else None
+    return ServingSystem(model, vectorizer, version, time.time(), threshold, explainer, campaigns)
+
+def _decide(model, proba, threshold):
+    """Column of `proba` each row is assigned to: argmax, or fraud iff p(fraud) > threshold."""
+    if threshold is None:
+        return proba.argmax(axis=1)
+    fraud = list(model.classes_).index(1)
+    return np.where(proba[:, fraud] > threshold, fraud, 1 - fraud)
+
+def _score_cleaned(model, vectorizer, cleaned, threshold=None, explainer=None, campaigns=None, metrics=None):
+    start = time.perf_counter()
+    vec_texts = vectorizer.transform(cleaned)
+    vectorized = time.perf_counter()
+    proba = model.predict_proba(vec_texts)
+    scored = time.perf_counter()
+    if metrics is not None:
+        metrics.observe_stage("vectorize", vectorized - start)
+        metrics.observe_stage("predict_proba", scored - vectorized)
+    best = _decide(model, proba, threshold)
+    predictions = model.classes_[best]
+    confidences = proba[np.arange(len(cleaned)), best]
+    results = [
+        ("SCAM / FRAUD" if prediction == 1 else "LEGITIMATE", float(confidence))
+        for prediction, confidence in zip(predictions, confidences)
+    ]
+    if explainer is None and campaigns is None:
+        return results
+    # Explained from the matrix that was just scored; nothing is re-vectorized.
+    explanations = explainer.explain(vec_texts) if explainer is not None else [None] * len(results)
+    explained = time.perf_counter()
+    matches = campaigns.match(cleaned) if campaigns is not None else [None] * len(results)
+    if metrics is not None:
+        if explainer is not None:
+            metrics.observe_stage("explain", explained - scored)
+        if campaigns is not None:
+            metrics.observe_stage("campaign_match", time.perf_counter() - explained)
+    return [result + extra for result, extra in zip(results, zip(explanations, matches))]
+
+def predict_messages(model, vectorizer, texts, cache=None, threshold=None, explainer=None, campaigns=None,
+                     metrics=None):
+    """
+    Classify a list of texts in one pass. The whole batch is cleaned, turned into
+    a single sparse matrix and scored with one predict_proba call; labels are the
+    argmax of those probabilities, so predict() is never run separately. With a
+    threshold, a text is fraud iff its fraud probability is > threshold.
+    Returns a list of (label, confidence) tuples in input order, where
+    confidence is the probability of the returned label. With an Explainer
+    and/or a CampaignIndex, each tuple is (label, confidence, top_tokens,
+    campaign), where the part not asked for is None.
+
+    With a PredictionCache, texts whose cleaned form was seen before are served
+    from it and only the misses are vectorized and scored.
+
+    `metrics` (e.g. the API's ServingMetrics) is told how long each stage
+    took through metrics.observe_stage(stage, seconds).
+    """
+    start = time.perf_counter()
+    cleaned = [clean_text(text) for text in texts]
+    if metrics is not None:
+        metrics.observe_stage("clean", time.perf_counter() - start)
+    if not cleaned:
+        return []
+    if cache is None:
+        return _score_cleaned(model, vectorizer, cleaned, threshold, explainer, campaigns, metrics)
+
+    start = time.perf_counter()
+    namespace = cache.namespace
+    keys = [cache.key(c) for c in cleaned]
+    results = [cache.get(k) for k in keys]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if metrics is not None:
+        metrics.observe_stage("cache_lookup", time.perf_counter() - start)
+    if misses:
+        scored = _score_cleaned(
+            model, vectorizer, [cleaned[i] for i in misses], threshold, explainer, campaigns, metrics
+        )
+        for i, result in zip(misses, scored):
+            results[i] = result
+            cache.put(keys[i], result, namespace)
+    return results
+
+def fraud_probabilities(model, vectorizer, texts, threshold=None):
+    """
+    Clean and score a batch without building per-message tuples, for bulk
+    scoring. Returns (predictions, fraud_probability) arrays; predictions are
+    decided exactly as in predict_messages().
+    """
+    cleaned = [clean_text(text) for text in texts]
+    if not cleaned:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    proba = model.predict_proba(vectorizer.transform(cleaned))
+    predictions = model.classes_[_decide(model, proba, threshold)]
+    return predictions, proba[:, list(model.classes_).index(1)]
+
+def predict_message(model, vectorizer, text, cache=None, threshold=None, explainer=None, campaigns=None):
+    return predict_messages(model, vectorizer, [text], cache, threshold, explainer, campaigns)[0]
 
 def main():
     model, vectorizer = load_system()
+    threshold = load_threshold()
+    cache = PredictionCache(maxsize=1000)
     print("\n" + "="*50)
     print("   ADVANCE FEE FRAUD DETECTOR (v1.0)   ")
     print("   Type a message and press Enter.     ")
@@ -48,10 +291,30 @@ def main():
             break
         if len(user_input.strip()) == 0:
             continue
-        label, confidence = predict_message(model, vectorizer, user_input)
+        label, confidence = predict_message(model, vectorizer, user_input, cache, threshold)
         print(f"\nResult: {label}")
         print(f"Confidence: {confidence:.2%}")
         print("-" * 30 + "\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Classify messages interactively, or score a file with `score`.")
+    commands = parser.add_subparsers(dest="command")
+    score_parser = commands.add_parser("score", help="bulk-score an mbox, CSV or JSONL file")
+    score_parser.add_argument("--in", dest="in_path", required=True, help="archive.mbox, file.csv or file.jsonl")
+    score_parser.add_argument("--out", required=True, help="results.parquet or results.csv")
+    score_parser.add_argument("--format", choices=["mbox", "csv", "jsonl"],
+                              help="input format (default: from the file extension)")
+    score_parser.add_argument("--text-column", default="text", help="CSV column / JSON key holding the message")
+    score_parser.add_argument("--chunksize", type=int, default=10_000, help="messages scored per chunk")
+    score_parser.add_argument("--workers", type=int, default=1, help="scoring processes")
+    score_parser.add_argument("--encoding", default="utf-8")
+    score_parser.add_argument("--restart", action="store_true", help="discard progress of an interrupted run")
+    args = parser.parse_args()
+    if args.command == "score":
+        from bulk_score import score_file
+
+        score_file(args.in_path, args.out, fmt=args.format, text_column=args.text_column,
+                   chunksize=args.chunksize, workers=args.workers, encoding=args.encoding,
+                   restart=args.restart)
+    else:
+        main()
\ No newline at end of file
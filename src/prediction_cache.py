@@ -0,0 +1,79 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded, thread-safe LRU cache of prediction results keyed by a hash of the
+    *cleaned* text, so messages that differ only in case, punctuation or
+    whitespace share one entry.
+
+    Entries are stored under the current namespace (e.g. a model version).
+    reset() clears the cache and switches namespace; a result computed by the
+    previous model that is put() after the switch is dropped instead of being
+    served as a stale hit.
+    """
+
+    def __init__(self, maxsize=10_000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl if ttl else None
+        self.namespace = ""
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(cleaned):
+        return hashlib.blake2b(cleaned.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, namespace=None):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if namespace is not None and namespace != self.namespace:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def reset(self, namespace=""):
+        with self._lock:
+            self._data.clear()
+            self.namespace = namespace
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -1,32 +1,39 @@
 import pandas as pd
-import numpy as np
 import os
+import sys
 import joblib
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from data_loader import processed_columns, processed_path, read_processed
+from evaluation import curves, evaluate
+from explain import Explainer
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-PROCESSED_FILE = os.path.join(BASE_DIR, "data", "processed", "clean_dataset.csv")
 TEST_PREDS_PATH = os.path.join(BASE_DIR, "data", "processed", "test_predictions.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "models", "aff_model.pkl")
 VEC_PATH = os.path.join(BASE_DIR, "models", "vectorizer.pkl")
 
 def print_dataset_stats():
-    """Print dataset statistics from clean_dataset.csv"""
+    """Print dataset statistics from the processed dataset (CSV or Parquet)"""
     print("=" * 70)
     print("DATASET STATISTICS")
     print("=" * 70)
     
-    if not os.path.exists(PROCESSED_FILE):
-        print(f"Dataset file not found: {PROCESSED_FILE}")
+    processed_file = processed_path()
+    if not os.path.exists(processed_file):
+        print(f"Dataset file not found: {processed_file}")
         print("   Run: python src/data_loader.py first\n")
         return False
     
-    df = pd.read_csv(PROCESSED_FILE)
+    # Only the columns the stats need, plus the raw 'text' column, which is
+    # read solely so the missing-value check below covers it.
+    columns = processed_columns(processed_file)
+    df = read_processed([c for c in ('label', 'text', 'clean_text') if c in columns], path=processed_file)
     
     print(f"\n Dataset Shape:")
     print(f"   Total Samples: {df.shape[0]:,}")
-    print(f"   Columns: {df.shape[1]}")
-    print(f"   Column Names: {', '.join(df.columns)}")
+    print(f"   Columns: {len(columns)}")
+    print(f"   Column Names: {', '.join(columns)}")
     
     print(f"\n Label Distribution:")
     label_counts = df['label'].value_counts().sort_index()
@@ -75,20 +82,14 @@ def print_model_metrics():
     
     df = pd.read_csv(TEST_PREDS_PATH)
     
-    y_true = df['label']
-    y_pred = df['prediction']
-    
-    acc = accuracy_score(y_true, y_pred)
-    prec = precision_score(y_true, y_pred)
-    rec = recall_score(y_true, y_pred)
-    f1 = f1_score(y_true, y_pred)
-    cm = confusion_matrix(y_true, y_pred)
+    y_true = df['label'].to_numpy()
+    cm, metrics = evaluate(y_true, df['prediction'].to_numpy())
     
     print(f"\n Test Set Performance (20% holdout):")
-    print(f"   Accuracy:  {acc:.2%}")
-    print(f"   Precision: {prec:.2%}")
-    print(f"   Recall:    {rec:.2%}")
-    print(f"   F1-Score:  {f1:.2%}")
+    print(f"   Accuracy:  {metrics['accuracy']:.2%}")
+    print(f"   Precision: {metrics['precision']:.2%}")
+    print(f"   Recall:    {metrics['recall']:.2%}")
+    print(f"   F1-Score:  {metrics['f1']:.2%}")
     
     print(f"\n Confusion Matrix:")
     print(f"                    Predicted")
@@ -96,14 +97,16 @@ def print_model_metrics():
     print(f"   Actual Legit    {cm[0][0]:5d}  {cm[0][1]:5d}")
     print(f"          Fraud    {cm[1][0]:5d}  {cm[1][1]:5d}")
     
-    tn, fp, fn, tp = cm.ravel()
-    specificity = tn / (tn + fp) if (tn + fp) > 0 else 0
     print(f"\n Additional Metrics:")
-    print(f"   True Positives (TP):  {tp}")
-    print(f"   True Negatives (TN):  {tn}")
-    print(f"   False Positives (FP): {fp}")
-    print(f"   False Negatives (FN): {fn}")
-    print(f"   Specificity:          {specificity:.2%}")
+    print(f"   True Positives (TP):  {metrics['tp']}")
+    print(f"   True Negatives (TN):  {metrics['tn']}")
+    print(f"   False Positives (FP): {metrics['fp']}")
+    print(f"   False Negatives (FN): {metrics['fn']}")
+    print(f"   Specificity:          {metrics['specificity']:.2%}")
+    if 'fraud_probability' in df.columns:
+        curve = curves(y_true, df['fraud_probability'].to_numpy())
+        print(f"   ROC AUC:              {curve['roc_auc']:.4f}")
+        print(f"   Average Precision:    {curve['average_precision']:.4f}")
     
     print()
     return True
@@ -126,15 +129,15 @@ def print_top_keywords():
     model = joblib.load(MODEL_PATH)
     vectorizer = joblib.load(VEC_PATH)
     
-    feature_names = vectorizer.get_feature_names_out()
-    fraud_prob_sorted_indices = model.feature_log_prob_[1].argsort()[::-1]
+    if not hasattr(vectorizer, 'get_feature_names_out'):
+        print(" Vectorizer is hashing-based; feature names are not recoverable.\n")
+        return False
     top_n = 20
-    top_words = [feature_names[i] for i in fraud_prob_sorted_indices[:top_n]]
-    top_scores = [model.feature_log_prob_[1][i] for i in fraud_prob_sorted_indices[:top_n]]
+    top_words, top_scores = Explainer.from_system(model, vectorizer).top_features(top_n)
     
-    print(f"\n Top {top_n} Keywords (by log probability for fraud class):")
-    print("   Rank | Keyword          | Log Probability")
-    print("   " + "-" * 45)
+    print(f"\n Top {top_n} Keywords (by fraud-vs-legit log-likelihood ratio):")
+    print("   Rank | Keyword          | Log-Likelihood Ratio")
+    print("   " + "-" * 50)
     for idx, (word, score) in enumerate(zip(top_words, top_scores), 1):
         print(f"   {idx:2d}  | {word:15s} | {score:8.4f}")
     
@@ -160,9 +163,13 @@ def print_model_info():
     
     print(f"\n Vectorizer:")
     print(f"   Type: {type(vectorizer).__name__}")
-    print(f"   Max Features: {vectorizer.max_features}")
-    print(f"   Stop Words: {vectorizer.stop_words}")
-    print(f"   Vocabulary Size: {len(vectorizer.vocabulary_)}")
+    if hasattr(vectorizer, 'vocabulary_'):
+        print(f"   Max Features: {vectorizer.max_features}")
+        print(f"   Stop Words: {vectorizer.stop_words}")
+        print(f"   Vocabulary Size: {len(vectorizer.vocabulary_)}")
+    else:
+        print(f"   Hashed Features: {vectorizer.n_features}")
+        print(f"   Stop Words: {vectorizer.stop_words}")
     
     print()
     return True
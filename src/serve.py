@@ -0,0 +1,93 @@
+import gc
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from . import api
+
+
+def _bind(host, port, backlog=2048):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock, log_level):
+    config = uvicorn.Config(api.app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host="127.0.0.1", port=8000, workers=1, log_level="info"):
+    """
+    Pre-fork server: load the model once, bind the listening socket, then fork
+    `workers` uvicorn processes that accept on it.
+
+    Workers inherit the loaded model instead of unpickling their own, so its
+    pages are shared copy-on-write (the compiled scorer's arrays are mmapped
+    and shared through the page cache either way). gc.freeze() moves
+    everything allocated so far out of the collector's reach, so collections
+    in a worker do not write to, and thereby un-share, the parent's objects.
+    A worker that dies is replaced; SIGINT/SIGTERM stops them all.
+
+    Each worker keeps its own prediction cache and micro-batcher.
+    /admin/reload only reaches the worker that receives it, so multi-worker
+    deployments should reload through AFF_MODEL_WATCH_SECONDS instead.
+    """
+    system = api.preload()
+    if system is None:
+        print("Starting without a model; /predict will return 503 until one is loaded.")
+    sock = _bind(host, port)
+    print(f"Serving on http://{host}:{port} with {workers} worker(s), pid {os.getpid()}")
+    gc.freeze()
+    if workers <= 1:
+        _run_worker(sock, log_level)
+        return
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                _run_worker(sock, log_level)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting it.")
+            time.sleep(1)
+            spawn()
+    sock.close()
@@ -0,0 +1,82 @@
+import re
+
+# Kept free of pandas/NumPy so the serving path can import it cheaply;
+# data_loader re-exports clean_text for the ingestion scripts.
+
+HEADER_RE = re.compile(r'\b(from|to|subject|date|received):.*')
+
+class _KeepTable(dict):
+    """
+    str.translate table: ASCII letters, digits and '$' map to themselves and every
+    other character (punctuation, whitespace, non-ASCII) maps to a space. Misses
+    are filled in lazily so the table covers all of Unicode without building it.
+    """
+    def __missing__(self, codepoint):
+        self[codepoint] = ' '
+        return ' '
+
+_KEEP_TABLE = _KeepTable(
+    (ord(c), c) for c in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789$'
+)
+
+def clean_text(text):
+    # Same output as lower() -> header strip -> [^a-zA-Z0-9\s$] -> collapse \s+,
+    # but in one regex (skipped when there is no ':' to match) and one translate.
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    if ':' in text:
+        text = HEADER_RE.sub('', text)
+    return ' '.join(text.translate(_KEEP_TABLE).split())
+
+# Tokens as clean_text leaves them: runs of ASCII letters, digits and '$'.
+TOKEN_RE = re.compile(r'[A-Za-z0-9$]+')
+# Characters searched per budgeted token, so a text without separators is
+# still cut after a bounded amount of work.
+MAX_TOKEN_CHARS = 16
+
+def _head_and_tail(text, head, tail):
+    if head + tail >= len(text):
+        return text, len(text)
+    return text[:head] + '\n' + text[len(text) - tail:], head + tail
+
+def bound_text(text, max_chars=0, max_tokens=0):
+    """
+    Bounded-cost view of a long raw text: its first and last parts, where
+    fraud messages put the pitch and the payment instructions, kept within
+    `max_tokens` tokens and/or `max_chars` characters split evenly between
+    head and tail (0 disables a limit). Only the kept ends are ever scanned,
+    so the cost of cleaning, vectorizing and scoring no longer grows with the
+    input. Returns (text, scored_chars); the text is returned unchanged when
+    it is within both limits.
+    """
+    if not isinstance(text, str):
+        return text, 0
+    n = len(text)
+    # Characters kept from each end; head + tail >= n keeps the whole text.
+    head = tail = n
+    if max_tokens and n > max_tokens:
+        head_tokens = (max_tokens + 1) // 2
+        tail_tokens = max_tokens - head_tokens
+        window = head_tokens * MAX_TOKEN_CHARS
+        cut = min(window, n)
+        for i, match in enumerate(TOKEN_RE.finditer(text, 0, window), 1):
+            if i == head_tokens:
+                cut = match.end()
+                break
+        tail_start = n
+        if tail_tokens:
+            tail_start = max(cut, n - tail_tokens * MAX_TOKEN_CHARS)
+            starts = [match.start() for match in TOKEN_RE.finditer(text, tail_start)]
+            if len(starts) >= tail_tokens:
+                tail_start = starts[-tail_tokens]
+        if cut < tail_start:
+            head, tail = cut, n - tail_start
+    if max_chars and min(head + tail, n) > max_chars:
+        # Split evenly; an end that needs less leaves the rest to the other.
+        short = min(head, tail, max_chars // 2)
+        if head <= tail:
+            head, tail = short, min(tail, max_chars - short)
+        else:
+            head, tail = min(head, max_chars - short), short
+    return _head_and_tail(text, head, tail)
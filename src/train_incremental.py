@@ -0,0 +1,99 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import sys
+import time
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from compiled_model import COMPILED_PATH, sync_compiled
+from data_loader import DEFAULT_CHUNKSIZE, clean_text_series, iter_processed, read_processed
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+MODEL_PATH = os.path.join(MODEL_DIR, "aff_model.pkl")
+VEC_PATH = os.path.join(MODEL_DIR, "vectorizer.pkl")
+CLASSES = np.array([0, 1])
+
+def make_hashing_vectorizer(n_features=2 ** 18):
+    # Stateless: no vocabulary pass, so each chunk can be featurized on its own.
+    # alternate_sign/norm are disabled to keep features non-negative counts,
+    # which MultinomialNB requires.
+    return HashingVectorizer(stop_words='english', n_features=n_features,
+                             alternate_sign=False, norm=None)
+
+def _save(model, vectorizer):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    joblib.dump(model, MODEL_PATH)
+    joblib.dump(vectorizer, VEC_PATH)
+    sync_compiled(model, vectorizer, COMPILED_PATH)
+
+def train_streaming(chunksize=DEFAULT_CHUNKSIZE, n_features=2 ** 18):
+    """
+    Train from scratch without holding the corpus in memory: the processed
+    dataset is read chunk by chunk, hashed, and fed to MultinomialNB.partial_fit.
+    """
+    print("--- INCREMENTAL TRAINING (HASHING FEATURES) ---")
+    vectorizer = make_hashing_vectorizer(n_features)
+    model = MultinomialNB()
+    start = time.perf_counter()
+    n_rows = 0
+    for i, chunk in enumerate(iter_processed(['label', 'clean_text'], chunksize), 1):
+        chunk = chunk.dropna()
+        X = vectorizer.transform(chunk['clean_text'].astype(str))
+        model.partial_fit(X, chunk['label'].to_numpy(), classes=CLASSES)
+        n_rows += len(chunk)
+        print(f"   Chunk {i}: {len(chunk)} rows ({n_rows} total, {time.perf_counter() - start:.1f}s)")
+    if n_rows == 0:
+        print("No rows found in the processed dataset; nothing saved.")
+        return
+    _save(model, vectorizer)
+    print(f"Trained on {n_rows} rows in {time.perf_counter() - start:.1f}s and saved to {MODEL_DIR}.")
+
+def _read_batch(path):
+    if path.endswith('.jsonl') or path.endswith('.ndjson'):
+        return pd.read_json(path, lines=True)
+    return read_processed(path=path)
+
+def update_model(batch_path):
+    """
+    Fold a new batch of labelled messages into the saved model with partial_fit.
+    The batch needs a 'label' column and either 'clean_text' or raw 'text'. Cost
+    is proportional to the batch: the saved vectorizer is reused as-is (a
+    CountVectorizer keeps its vocabulary; unseen words are ignored).
+    """
+    print(f"--- UPDATING {os.path.basename(MODEL_PATH)} WITH {batch_path} ---")
+    start = time.perf_counter()
+    model = joblib.load(MODEL_PATH)
+    vectorizer = joblib.load(VEC_PATH)
+    batch = _read_batch(batch_path)
+    if 'clean_text' not in batch.columns:
+        batch['clean_text'] = clean_text_series(batch['text'])
+    batch = batch[batch['clean_text'].str.len() > 10]
+    if batch.empty:
+        print("Batch has no usable rows; model unchanged.")
+        return
+    X = vectorizer.transform(batch['clean_text'])
+    model.partial_fit(X, batch['label'].astype(int).to_numpy(), classes=CLASSES)
+    _save(model, vectorizer)
+    counts = batch['label'].value_counts()
+    print(f"Added {len(batch)} rows (fraud={counts.get(1, 0)}, legit={counts.get(0, 0)}) "
+          f"in {time.perf_counter() - start:.2f}s.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core / incremental training with partial_fit.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--from-scratch', action='store_true',
+                       help="stream the processed dataset through a hashing vectorizer")
+    group.add_argument('--update', metavar='BATCH',
+                       help="CSV/Parquet/JSONL of labelled messages to add to models/aff_model.pkl")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--n-features', type=int, default=2 ** 18)
+    args = parser.parse_args()
+    if args.update:
+        update_model(args.update)
+    else:
+        train_streaming(args.chunksize, args.n_features)
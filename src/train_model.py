@@ -1,44 +1,111 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
+import sys
+import time
 import joblib
+from joblib import Parallel, delayed
 from sklearn.model_selection import StratifiedKFold, train_test_split
-from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from compiled_model import COMPILED_PATH, sync_compiled
+from data_loader import processed_path, read_processed
+from evaluation import evaluate, save_scores
+from feature_cache import load_or_build_features
+from featurizers import DEFAULT_FEATURIZER, DTYPES, FEATURIZERS, featurizer_config, make_vectorizer, matrix_nbytes
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_PATH = os.path.join(BASE_DIR, "data", "processed", "clean_dataset.csv")
 MODEL_DIR = os.path.join(BASE_DIR, "models")
 TEST_PREDS_PATH = os.path.join(BASE_DIR, "data", "processed", "test_predictions.csv")
+SCORES_PATH = os.path.join(BASE_DIR, "data", "processed", "scores.npz")
+
+def _fit_and_predict(X_vec, y, train_idx, test_idx):
+    """
+    One MultinomialNB fit for a pool worker, plus predictions and fraud
+    probabilities on test_idx if given (predictions are the argmax).
+    """
+    start = time.perf_counter()
+    clf = MultinomialNB()
+    clf.fit(X_vec[train_idx], y[train_idx])
+    preds = proba = None
+    if test_idx is not None:
+        all_proba = clf.predict_proba(X_vec[test_idx])
+        preds = clf.classes_[all_proba.argmax(axis=1)]
+        proba = all_proba[:, 1]
+    return clf, preds, proba, time.perf_counter() - start
+
+def _size_mb(path):
+    if os.path.isdir(path):
+        return sum(_size_mb(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path) / 1e6 if os.path.exists(path) else 0.0
 
-def train_robust():
+def train_robust(use_cache=True, n_jobs=1, featurizer=None):
+    """
+    n_jobs > 1 runs the 5 CV folds, the holdout fit and the final fit in a joblib
+    process pool. X_vec's arrays are dumped to a memory map once per run and
+    shared read-only by every worker instead of being pickled per task. Every fit
+    is deterministic, so metrics match a serial run exactly.
+
+    `featurizer` is a configuration from featurizers.featurizer_config()
+    (default: the unigram CountVectorizer). Returns a report with the
+    per-stage timings in seconds, the feature matrix's size, the CV and
+    holdout metrics and the size of the saved artifacts.
+    """
+    featurizer = featurizer or featurizer_config()
+    timings = {}
+    run_start = time.perf_counter()
     os.makedirs(MODEL_DIR, exist_ok=True)
     print("Loading comprehensive dataset...")
-    df = pd.read_csv(DATA_PATH).dropna()
+    data_path = processed_path()
+    df = read_processed(['label', 'clean_text'], path=data_path).dropna()
     df['clean_text'] = df['clean_text'].astype(str)
     X = df['clean_text']
     y = df['label']
-    print("Vectorizing text...")
-    vectorizer = CountVectorizer(stop_words='english', max_features=5000)
-    X_vec = vectorizer.fit_transform(X)
+    vectorizer = make_vectorizer(featurizer)
+    print(f"Vectorizing text ({featurizer['name']}: {type(vectorizer).__name__})...")
+    start = time.perf_counter()
+    if use_cache:
+        X_vec, vectorizer = load_or_build_features(data_path, X, y, vectorizer)
+    else:
+        X_vec = vectorizer.fit_transform(X).tocsr()
+    timings['vectorize'] = time.perf_counter() - start
+    features = {
+        "n_features": int(X_vec.shape[1]),
+        "nnz": int(X_vec.nnz),
+        "matrix_mb": matrix_nbytes(X_vec) / 1e6,
+        "dtype": str(X_vec.dtype),
+    }
+    print(f"   {features['n_features']} features, nnz={features['nnz']}, "
+          f"{features['matrix_mb']:.1f} MB as {features['dtype']}")
 
-    print("\n--- PHASE 1: 5-Fold Cross-Validation (Robustness Check) ---")
     skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+    folds = list(skf.split(X_vec, y))
+    # Split row positions rather than texts so both halves are slices of X_vec;
+    # the vectorizer is already fitted, so re-tokenizing would give the same rows.
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+    tasks = folds + [(train_idx, test_idx), (np.arange(len(y)), None)]
+
+    print(f"\nFitting {len(folds)} CV folds, the holdout model and the final model (n_jobs={n_jobs})...")
+    start = time.perf_counter()
+    y_arr = y.to_numpy()
+    results = Parallel(n_jobs=n_jobs, max_nbytes='1M', mmap_mode='r')(
+        delayed(_fit_and_predict)(X_vec, y_arr, tr, te) for tr, te in tasks
+    )
+    timings['fit (wall)'] = time.perf_counter() - start
+    timings['fit (sum of tasks)'] = sum(r[3] for r in results)
+    fold_results, (_, viz_preds, viz_proba, _), (final_model, _, _, _) = results[:-2], results[-2], results[-1]
+
+    print("\n--- PHASE 1: 5-Fold Cross-Validation (Robustness Check) ---")
     metrics = {'acc': [], 'prec': [], 'rec': [], 'f1': []}
-    fold = 1
-    for train_idx, test_idx in skf.split(X_vec, y):
-        X_tr, X_te = X_vec[train_idx], X_vec[test_idx]
-        y_tr, y_te = y.iloc[train_idx], y.iloc[test_idx]
-        clf = MultinomialNB()
-        clf.fit(X_tr, y_tr)
-        preds = clf.predict(X_te)
-        metrics['acc'].append(accuracy_score(y_te, preds))
-        metrics['prec'].append(precision_score(y_te, preds))
-        metrics['rec'].append(recall_score(y_te, preds))
-        metrics['f1'].append(f1_score(y_te, preds))
-        print(f"   Fold {fold}: Accuracy = {metrics['acc'][-1]:.2%}")
-        fold += 1
+    for fold, ((_, fold_test_idx), (_, preds, _, seconds)) in enumerate(zip(folds, fold_results), 1):
+        _, fold_metrics = evaluate(y_arr[fold_test_idx], preds)
+        metrics['acc'].append(fold_metrics['accuracy'])
+        metrics['prec'].append(fold_metrics['precision'])
+        metrics['rec'].append(fold_metrics['recall'])
+        metrics['f1'].append(fold_metrics['f1'])
+        print(f"   Fold {fold}: Accuracy = {metrics['acc'][-1]:.2%} ({seconds:.2f}s)")
 
     print("\n   [Average CV Results]")
     print(f"   Accuracy:  {np.mean(metrics['acc']):.2%}")
@@ -50,34 +117,77 @@ def train_robust():
     for fold in range(5):
         print(f"   Fold {fold+1}: Acc={metrics['acc'][fold]:.2%}, Prec={metrics['prec'][fold]:.2%}, Rec={metrics['rec'][fold]:.2%}, F1={metrics['f1'][fold]:.2%}")
 
+    # Every row is in exactly one CV test fold, so these are out-of-fold scores for the whole dataset.
+    cv_fold = np.empty(len(y_arr), dtype=np.int8)
+    cv_proba = np.empty(len(y_arr))
+    for fold, ((_, fold_test_idx), (_, _, proba, _)) in enumerate(zip(folds, fold_results)):
+        cv_fold[fold_test_idx] = fold
+        cv_proba[fold_test_idx] = proba
+
     print("\n--- PHASE 2: Generating Test Data for Visualization ---")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    X_train_vec = vectorizer.transform(X_train)
-    X_test_vec = vectorizer.transform(X_test)
-    viz_model = MultinomialNB()
-    viz_model.fit(X_train_vec, y_train)
-    viz_preds = viz_model.predict(X_test_vec)
+    X_test = X.iloc[test_idx]
+    y_test = y.iloc[test_idx]
     
-    test_acc = accuracy_score(y_test, viz_preds)
-    test_prec = precision_score(y_test, viz_preds)
-    test_rec = recall_score(y_test, viz_preds)
-    test_f1 = f1_score(y_test, viz_preds)
+    _, test_metrics = evaluate(y_test, viz_preds)
     print(f"\n   [Test Set Performance (20% holdout)]")
-    print(f"   Accuracy:  {test_acc:.2%}")
-    print(f"   Precision: {test_prec:.2%}")
-    print(f"   Recall:    {test_rec:.2%}")
-    print(f"   F1-Score:  {test_f1:.2%}")
+    print(f"   Accuracy:  {test_metrics['accuracy']:.2%}")
+    print(f"   Precision: {test_metrics['precision']:.2%}")
+    print(f"   Recall:    {test_metrics['recall']:.2%}")
+    print(f"   F1-Score:  {test_metrics['f1']:.2%}")
     
-    test_df = pd.DataFrame({'text': X_test, 'label': y_test, 'prediction': viz_preds})
+    test_df = pd.DataFrame({'text': X_test, 'label': y_test, 'prediction': viz_preds,
+                            'fraud_probability': viz_proba})
     test_df.to_csv(TEST_PREDS_PATH, index=False)
     print(f"\n   -> Saved test predictions to {TEST_PREDS_PATH}")
+    save_scores(SCORES_PATH, y_arr, cv_fold, cv_proba, test_idx, viz_proba)
+    print(f"   -> Saved per-row fraud probabilities to {SCORES_PATH}")
 
     print("\n--- PHASE 3: Training Final System Brain ---")
-    final_model = MultinomialNB()
-    final_model.fit(X_vec, y)
-    joblib.dump(final_model, os.path.join(MODEL_DIR, "aff_model.pkl"))
-    joblib.dump(vectorizer, os.path.join(MODEL_DIR, "vectorizer.pkl"))
+    start = time.perf_counter()
+    model_path = os.path.join(MODEL_DIR, "aff_model.pkl")
+    vec_path = os.path.join(MODEL_DIR, "vectorizer.pkl")
+    joblib.dump(final_model, model_path)
+    joblib.dump(vectorizer, vec_path)
+    # Hashed features have no vocabulary to compile; serving then uses the pickles.
+    if sync_compiled(final_model, vectorizer, COMPILED_PATH):
+        print(f"   -> Exported compiled scorer to {COMPILED_PATH}")
+    timings['save'] = time.perf_counter() - start
     print("System fully trained and saved.")
 
+    timings['total'] = time.perf_counter() - run_start
+    print(f"\n   [Timing, n_jobs={n_jobs}]")
+    for stage, seconds in timings.items():
+        print(f"   {stage:20s} {seconds:8.2f}s")
+    return {
+        "featurizer": {k: list(v) if isinstance(v, tuple) else v for k, v in featurizer.items()},
+        "timings": timings,
+        "features": features,
+        "cv": {name: float(np.mean(values)) for name, values in metrics.items()},
+        "holdout": {name: float(test_metrics[name]) for name in ('accuracy', 'precision', 'recall', 'f1')},
+        "artifacts_mb": {
+            "pickles": _size_mb(model_path) + _size_mb(vec_path),
+            "compiled": _size_mb(COMPILED_PATH),
+        },
+    }
+
+def _df(value):
+    """min_df/max_df as sklearn reads them: a document count if integral, else a fraction."""
+    return int(value) if value.isdigit() else float(value)
+
 if __name__ == "__main__":
-    train_robust()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cross-validate, evaluate and train the AFF model.")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="re-tokenize the corpus instead of using data/cache/")
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help="processes for the CV folds and holdout/final fits; -1 uses all cores")
+    parser.add_argument('--featurizer', choices=list(FEATURIZERS), default=DEFAULT_FEATURIZER,
+                        help="feature extraction preset (default: %(default)s); see src/featurizers.py")
+    parser.add_argument('--min-df', type=_df, help="ignore terms in fewer documents (count, or fraction if < 1)")
+    parser.add_argument('--max-df', type=_df, help="ignore terms in more documents (fraction, or count)")
+    parser.add_argument('--max-features', type=int, help="keep only the most frequent terms")
+    parser.add_argument('--dtype', choices=list(DTYPES), help="feature matrix dtype (default: int64 counts, "
+                                                            "float64 for tfidf/hashing)")
+    args = parser.parse_args()
+    config = featurizer_config(args.featurizer, min_df=args.min_df, max_df=args.max_df,
+                               max_features=args.max_features, dtype=args.dtype)
+    train_robust(use_cache=not args.no_cache, n_jobs=args.n_jobs, featurizer=config)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from evaluation import expected_costs, load_scores, threshold_sweep
+from predict import SERVING_CONFIG_PATH, artifact_version, load_threshold, model_paths, write_threshold
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCORES_PATH = os.path.join(BASE_DIR, "data", "processed", "scores.npz")
+
+def parse_cost(value):
+    """'FP:FN' -> (false_positive_cost, false_negative_cost)."""
+    try:
+        fp_cost, fn_cost = (float(part) for part in value.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected FP_COST:FN_COST, got {value!r}")
+    return fp_cost, fn_cost
+
+def _pick(values, thresholds, best):
+    """Index of the threshold achieving `best`; ties go to the one nearest the 0.5 default."""
+    tied = np.flatnonzero(values == best)
+    return int(tied[np.argmin(np.abs(thresholds[tied] - 0.5))])
+
+def _print_row(sweep, i, extra=""):
+    print(f"   {sweep['threshold'][i]:9.3f} | {sweep['precision'][i]:9.2%} | {sweep['recall'][i]:7.2%} | "
+          f"{sweep['f1'][i]:7.2%} | {sweep['fpr'][i]:7.2%} | {sweep['fp'][i]:6d} | {sweep['fn'][i]:6d}{extra}")
+
+def tune(source='cv', thresholds=None, costs=(), select=None, write=False, show_table=False,
+         scores_path=SCORES_PATH):
+    """
+    Evaluate every threshold (and every cost matrix) against the stored
+    probabilities in one sweep, print the best threshold per criterion and,
+    with write=True, store the selected one in the serving config.
+    """
+    labels, scores, folds = load_scores(scores_path, source)
+    if thresholds is None:
+        thresholds = np.round(np.arange(0.0, 1.0, 0.01), 2)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    if np.any((thresholds < 0.0) | (thresholds >= 1.0)):
+        raise ValueError("Thresholds must be in [0, 1): a message is fraud iff p > threshold.")
+    sweep = threshold_sweep(labels, scores, thresholds)
+    print(f"Evaluated {len(thresholds)} thresholds on {len(labels):,} {source} scores "
+          f"({int(labels.sum()):,} fraud). Rule: fraud iff p > threshold.")
+
+    header = "   Threshold | Precision | Recall  | F1      | FPR     | FP     | FN"
+    if show_table:
+        print("\n" + header)
+        print("   " + "-" * 70)
+        for i in range(len(thresholds)):
+            _print_row(sweep, i)
+
+    current = load_threshold()
+    current_value = 0.5 if current is None else current
+    baseline = threshold_sweep(labels, scores, [current_value])
+    print(f"\n   [Current serving threshold: {current_value:g}"
+          f"{' (argmax default)' if current is None else ''}]")
+    print(header)
+    _print_row(baseline, 0)
+
+    best = {}
+    i = _pick(sweep['f1'], thresholds, sweep['f1'].max())
+    best['f1'] = i
+    print("\n   [Best F1]")
+    print(header)
+    _print_row(sweep, i)
+
+    if costs:
+        totals = expected_costs(sweep, costs)
+        at_current = expected_costs(baseline, costs)[:, 0]
+        print("\n   [Lowest total cost per cost matrix]")
+        print(header + " | cost (current)")
+        for k, (fp_cost, fn_cost) in enumerate(costs):
+            i = _pick(totals[k], thresholds, totals[k].min())
+            best[f"cost:{fp_cost:g}:{fn_cost:g}"] = i
+            if k == 0:
+                best['cost'] = i
+            _print_row(sweep, i, f" | {totals[k, i]:,.0f} ({at_current[k]:,.0f})   FP={fp_cost:g}, FN={fn_cost:g}")
+
+    if folds is not None:
+        # Stability of the best-F1 threshold: the same sweep per CV fold.
+        t = thresholds[best['f1']]
+        per_fold = [threshold_sweep(labels[folds == f], scores[folds == f], [t])['f1'][0]
+                    for f in np.unique(folds)]
+        print(f"\n   F1 at {t:g} per CV fold: " + ", ".join(f"{v:.2%}" for v in per_fold))
+
+    if not write:
+        return None
+    criterion = select or ('cost' if costs else 'f1')
+    if criterion not in best:
+        raise ValueError(f"Cannot select by {criterion!r}; pass --cost to select by cost.")
+    chosen = float(thresholds[best[criterion]])
+    write_threshold(chosen, selected_by=criterion, source=source,
+                    costs=[list(c) for c in costs] or None,
+                    model_version=artifact_version(model_paths()))
+    print(f"\n   -> Wrote threshold {chosen:g} ({criterion}) to {SERVING_CONFIG_PATH}")
+    return chosen
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate decision thresholds and cost matrices against the stored training scores.")
+    parser.add_argument('--source', choices=['cv', 'holdout'], default='cv',
+                        help="out-of-fold scores of every row (cv) or the 20%% holdout")
+    parser.add_argument('--thresholds', type=float, nargs='+',
+                        help="thresholds to evaluate (default: 0.00 to 0.99 in steps of 0.01)")
+    parser.add_argument('--cost', type=parse_cost, action='append', default=[], metavar='FP:FN',
+                        help="cost of a false positive and of a false negative; repeatable")
+    parser.add_argument('--select', help="criterion for --write: f1, cost (first --cost) or cost:FP:FN")
+    parser.add_argument('--write', action='store_true', help="write the selected threshold to the serving config")
+    parser.add_argument('--set', type=float, metavar='THRESHOLD',
+                        help="write this threshold to the serving config without evaluating")
+    parser.add_argument('--table', action='store_true', help="print every evaluated threshold")
+    args = parser.parse_args()
+    if args.set is not None:
+        if not 0.0 <= args.set < 1.0:
+            parser.error("--set must be in [0, 1)")
+        write_threshold(args.set, selected_by='manual', model_version=artifact_version(model_paths()))
+        print(f"Wrote threshold {args.set:g} to {SERVING_CONFIG_PATH}")
+    else:
+        try:
+            tune(source=args.source, thresholds=args.thresholds, costs=args.cost, select=args.select,
+                 write=args.write, show_table=args.table)
+        except ValueError as e:
+            parser.error(str(e))
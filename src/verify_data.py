@@ -1,16 +1,17 @@
-import pandas as pd
 import os
+import sys
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-PROCESSED_FILE = os.path.join(BASE_DIR, "data", "processed", "clean_dataset.csv")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from data_loader import processed_path, read_processed
 
 def inspect_data():
-    if not os.path.exists(PROCESSED_FILE):
-        print(f"Error: File not found at {PROCESSED_FILE}")
+    processed_file = processed_path()
+    if not os.path.exists(processed_file):
+        print(f"Error: File not found at {processed_file}")
         return
 
-    print("Loading dataset...")
-    df = pd.read_csv(PROCESSED_FILE)
+    print(f"Loading dataset from {os.path.basename(processed_file)}...")
+    df = read_processed(path=processed_file)
 
     print("\n--- Dataset Shape ---")
     print(f"Rows: {df.shape[0]}")
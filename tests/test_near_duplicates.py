@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from near_duplicates import CampaignIndex, MinHasher  # noqa: E402
+
+QUERY = "dear friend i am the son of the late minister and need your help to transfer 15 million usd"
+OTHER = "meeting moved to thursday please bring the quarterly report and the budget sheets"
+
+
+def test_match_finds_every_campaign_sharing_a_band_key():
+    hasher = MinHasher()
+    query_sig, other_sig = hasher.signatures([QUERY, OTHER])
+    rows = hasher.rows
+    # Campaign B is a near-duplicate of the query that shares only its first
+    # band with it: one value differs in every other band, so B still agrees
+    # on 113 of 128 values. Campaign A shares that same first band but is
+    # otherwise unrelated, and sorts first under the shared key.
+    b_sig = query_sig.copy()
+    b_sig[rows::rows] ^= 1
+    a_sig = other_sig.copy()
+    a_sig[:rows] = query_sig[:rows]
+    sig = np.stack([a_sig, b_sig])
+    index = CampaignIndex.from_clusters(np.array([0, 1]), sig, [1, 0], hasher=hasher, min_size=1)
+
+    keys = hasher.band_keys(sig)
+    assert keys[0, 0] == keys[1, 0]
+    assert not (keys[0, 1:] == hasher.band_keys(query_sig[None])[0, 1:]).any()
+    assert not (keys[1, 1:] == hasher.band_keys(query_sig[None])[0, 1:]).any()
+
+    match, = index.match([QUERY])
+    assert match is not None
+    assert match["id"] == index.ids[1]
+    assert match["similarity"] == (hasher.num_perm - hasher.bands + 1) / hasher.num_perm
+    assert match["fraud_share"] == 0.0
+
+
+def test_match_without_candidates():
+    hasher = MinHasher()
+    sig = hasher.signatures([QUERY])
+    index = CampaignIndex.from_clusters(np.array([0]), sig, [1], hasher=hasher, min_size=1)
+    assert index.match([OTHER, "", QUERY])[:2] == [None, None]
+    assert index.match([QUERY])[0]["similarity"] == 1.0
@@ -0,0 +1,79 @@
+import os
+import re
+import sys
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from data_loader import clean_text  # noqa: E402
+
+# Unicode whitespace that str.split() and the regex \s both treat as spaces,
+# plus separators that only look like whitespace.
+WHITESPACE = " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0\u1680\u2000\u2003\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+LOOKALIKES = "\u200b\u180e\ufeff"
+NON_ASCII = (
+    "\xe9\xc9\xdf\xf8\xd8\xf1\xd1\xe7\u0130\u0131\u017f\u212a\u212b"
+    "\u03a3\u03c3\u03c2\u0414\u0436\u4e2d\u6587\ud55c\u0639\u0142\u0301\U0001f600"
+)
+HEADERS = ("from:", "to:", "subject:", "date:", "received:", "FROM:", "Subject:", "reply-to:", "xfrom:")
+WORDS = ("dear", "friend", "transfer", "$15", "million", "usd", "bank", "urgent", "beneficiary", "100%")
+
+
+def clean_text_reference(text):
+    """The original clean_text from data_loader.py, before it was rewritten."""
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = re.sub(r'\b(from|to|subject|date|received):.*', '', text)
+    text = re.sub(r'[^a-zA-Z0-9\s$]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+# Email-like text: words, header lines ending in any kind of line break,
+# runs of Unicode whitespace and non-ASCII letters, mixed with arbitrary text.
+header_lines = st.builds(
+    lambda header, value, end: header + value + end,
+    st.sampled_from(HEADERS),
+    st.text(max_size=20),
+    st.sampled_from(("\n", "\r\n", "\u2028", "\x85", "")),
+)
+email_text = st.lists(
+    st.one_of(
+        st.sampled_from(WORDS),
+        header_lines,
+        st.text(alphabet=WHITESPACE + LOOKALIKES, min_size=1, max_size=4),
+        st.text(alphabet=NON_ASCII, min_size=1, max_size=6),
+        st.text(max_size=10),
+    ),
+    max_size=40,
+).map("".join)
+
+
+@given(st.text())
+def test_matches_reference_on_any_text(text):
+    assert clean_text(text) == clean_text_reference(text)
+
+
+@settings(max_examples=1000)
+@given(email_text)
+def test_matches_reference_on_email_like_text(text):
+    assert clean_text(text) == clean_text_reference(text)
+
+
+def test_matches_reference_on_every_code_point():
+    for start in range(0, 0x110000, 0x1000):
+        text = " ".join(chr(c) for c in range(start, start + 0x1000) if not 0xD800 <= c <= 0xDFFF)
+        assert clean_text(text) == clean_text_reference(text)
+
+
+def test_header_lines_are_stripped_to_end_of_line():
+    text = "From: someone@example.com\nSubject: URGENT!!\nDear friend,\nplease send $500 to: me"
+    assert clean_text(text) == clean_text_reference(text) == "dear friend please send $500"
+
+
+def test_non_strings():
+    for value in (None, 3.5, float("nan"), b"bytes"):
+        assert clean_text(value) == clean_text_reference(value) == ""